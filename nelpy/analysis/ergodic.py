@@ -5,14 +5,46 @@
 
 __author__  = "Sergio J. Rey <srey@asu.edu> "
 
-__all__=['steady_state','fmpt']
+__all__=['steady_state','fmpt','var_fmpt','ergodic_stats','fmpt_batch']
 
 import numpy as np
 import numpy.linalg as la
+from scipy.linalg import lu_factor, lu_solve, cho_factor, cho_solve
+from scipy import sparse
+from scipy.sparse.linalg import spsolve
+from numba import jit
 
+# for chains with at most this many states, numpy dispatch overhead
+# dominates the actual work, and we use the jit-compiled kernels instead
+_NUMBA_MAX_K = 64
+
+# the jit-compiled kernels are cached on disk, so that their compilation is
+# not paid again in every new process. This cannot be a plain cache=True:
+# numba names the cache entries after the source file, but pickles the
+# compiled functions with the name of the module that wrote them. Entries
+# written while this file runs as a top-level module 'ergodic' (e.g. by
+# `python -m doctest nelpy/analysis/ergodic.py`) make every later
+# `import nelpy` fail with ModuleNotFoundError: No module named 'ergodic'
+# when they are loaded. A top-level module has an empty __package__, so
+# only imports through nelpy read and write the cache; standalone runs
+# compile in memory instead.
+_CACHE = bool(__package__)
+
+# dense chains with at least this many states and at most this fraction of
+# nonzero transitions are solved as sparse systems in steady_state
+_SPARSE_MIN_K = 256
+_SPARSE_MAX_DENSITY = 0.1
+
+@jit(nopython=True, cache=_CACHE)
 def set_self_transition_zero(x):
-    """Set cost/length of self-transition to zero."""
-    np.fill_diagonal(x, 0.0)
+    """Set cost/length of self-transition to zero.
+
+    The diagonal of the 2D array x is modified in place. Being compiled
+    in nopython mode, this can also be called (and inlined) from other
+    jit-compiled loops, such as bootstrap analyses over many matrices.
+    """
+    for i in range(min(x.shape[0], x.shape[1])):
+        x[i, i] = 0.0
 
 def steady_state(P):
     """
@@ -21,11 +53,17 @@ def steady_state(P):
     Parameters
     ----------
     P        : matrix (kxk)
-               an ergodic Markov transition probability matrix
+               an ergodic Markov transition probability matrix; may also be
+               a scipy.sparse matrix
     Returns
     -------
-    implicit : matrix (kx1)
+    implicit : array (k,)
                steady state distribution
+
+    .. versionchanged:: 0.2.3
+       Always returns a 1-D ndarray. For np.matrix input, this used to be
+       an np.matrix of shape (k, 1).
+
     Examples
     --------
     Taken from Kemeny and Snell. [1]_ Land of Oz example where the states are
@@ -37,25 +75,51 @@ def steady_state(P):
     >>> import numpy as np
     >>> p=np.matrix([[.5, .25, .25],[.5,0,.5],[.25,.25,.5]])
     >>> steady_state(p)
-    matrix([[ 0.4],
-            [ 0.2],
-            [ 0.4]])
+    array([0.4, 0.2, 0.4])
+
     Thus, the long run distribution for Oz is to have 40 percent of the
     days classified as Rain, 20 percent as Nice, and 40 percent as Snow
     (states are mutually exclusive).
+
+    Notes
+    -----
+    Rather than computing the full eigendecomposition of P^T, we solve
+    (P^T - I) pi = 0 subject to 1^T pi = 1, by replacing the last
+    (redundant) equation with the normalization constraint. For sparse P
+    (or large dense P with few nonzero transitions) this system is solved
+    with a sparse LU factorization instead.
     """
 
-    v,d=la.eig(np.transpose(P))
+    if sparse.issparse(P):
+        return _sparse_steady_state(P)
+    P=np.asarray(P)
+    k=P.shape[0]
+    if k <= _NUMBA_MAX_K:
+        return _steady_state_core(np.ascontiguousarray(
+            P, dtype=np.result_type(P.dtype, np.float32)))
+    if k >= _SPARSE_MIN_K and np.count_nonzero(P) <= _SPARSE_MAX_DENSITY*P.size:
+        return _sparse_steady_state(sparse.csr_matrix(P))
+
+    # keep the precision of floating point input (e.g. float32)
+    A=np.array(P.T, dtype=np.result_type(P.dtype, np.float32))
+    A[np.diag_indices(k)]-=1.
+    A[-1,:]=1.
+    b=np.zeros(k, dtype=A.dtype)
+    b[-1]=1.
 
-    # for a regular P maximum eigenvalue will be 1
-    mv=max(v)
-    # find its position
-    i=v.tolist().index(mv)
+    return la.solve(A, b)
 
-    # normalize eigenvector corresponding to the eigenvalue 1
-    return d[:,i]/sum(d[:,i])
+def _sparse_steady_state(P):
+    """steady_state for a scipy.sparse transition matrix P."""
+    k=P.shape[0]
+    A=(P.T - sparse.identity(k, format='csr')).tocsr()
+    # replace the last (redundant) equation with 1^T pi = 1
+    A=sparse.vstack([A[:-1], np.ones((1, k))], format='csc')
+    b=np.zeros(k)
+    b[-1]=1.
+    return spsolve(A, b).astype(np.result_type(P.dtype, np.float32), copy=False)
 
-def fmpt(P):
+def fmpt(P, *, reversible=None, dtype=np.float64):
     """
     Calculates the matrix of first mean passage times for an
     ergodic transition probability matrix.
@@ -63,12 +127,29 @@ def fmpt(P):
     ----------
     P    : matrix (kxk)
            an ergodic Markov transition probability matrix
+    reversible : bool, optional
+           if True, the fundamental matrix of large chains is obtained
+           from a Cholesky factorization of its symmetrized form; P must
+           then satisfy detailed balance, or a ValueError is raised.
+           Default (None) uses a single LU factorization that also yields
+           the steady state.
+    dtype : numpy dtype, optional
+           floating point precision of the computation. Default is
+           np.float64. For large chains (hundreds of states) the work is
+           memory-bound, and np.float32 roughly doubles throughput; it is
+           appropriate when only ~6 significant digits are needed. P is
+           converted to a C-contiguous array of this dtype on entry.
     Returns
     -------
-    M    : matrix (kxk)
+    M    : array (kxk)
            elements are the expected value for the number of intervals
            required for  a chain starting in state i to first enter state j
            If i=j then this is the recurrence time.
+
+    .. versionchanged:: 0.2.3
+       Always returns an ndarray. For np.matrix input, this used to be an
+       np.matrix.
+
     Examples
     --------
 
@@ -77,9 +158,10 @@ def fmpt(P):
     >>> p=np.matrix([[.5, .25, .25],[.5,0,.5],[.25,.25,.5]])
     >>> fm=fmpt(p)
     >>> fm
-    matrix([[ 2.5       ,  4.        ,  3.33333333],
-            [ 2.66666667,  5.        ,  2.66666667],
-            [ 3.33333333,  4.        ,  2.5       ]])
+    array([[2.5       , 4.        , 3.33333333],
+           [2.66666667, 5.        , 2.66666667],
+           [3.33333333, 4.        , 2.5       ]])
+
     Thus, if it is raining today in Oz we can expect a nice day to come
     along in another 4 days, on average, and snow to hit in 3.33 days. We can
     expect another rainy day in 2.5 days. If it is nice today in Oz, we would
@@ -95,25 +177,10 @@ def fmpt(P):
     .. [1] Kemeny, John, G. and J. Laurie Snell (1976) Finite Markov
        Chains. Springer-Verlag. Berlin
     """
-    P=np.matrix(P)
-    A=np.zeros_like(P)
-    ss=steady_state(P)
-    k=ss.shape[0]
-    for i in range(k):
-        A[:,i]=ss
-    A=A.transpose()
-    I=np.identity(k)
-    Z=la.inv(I-P+A)
-    E=np.ones_like(Z)
-    D=np.diag(1./np.diag(A))
-    Zdg=np.diag(np.diag(Z))
-    M=(I-Z+E*Zdg)*D
-    return M
-
-
-
+    P=np.ascontiguousarray(P, dtype=dtype)
+    return _ergodic_stats(P, reversible=reversible, variance=False)[1]
 
-def var_fmpt(P):
+def var_fmpt(P, *, reversible=None, dtype=np.float64):
     """
     Variances of first mean passage times for an ergodic transition
     probability matrix
@@ -121,20 +188,37 @@ def var_fmpt(P):
     ----------
     P    : matrix (kxk)
            an ergodic Markov transition probability matrix
+    reversible : bool, optional
+           if True, the fundamental matrix of large chains is obtained
+           from a Cholesky factorization of its symmetrized form; P must
+           then satisfy detailed balance, or a ValueError is raised.
+           Default (None) uses a single LU factorization that also yields
+           the steady state.
+    dtype : numpy dtype, optional
+           floating point precision of the computation. Default is
+           np.float64. For large chains (hundreds of states) the work is
+           memory-bound, and np.float32 roughly doubles throughput; it is
+           appropriate when only ~6 significant digits are needed. P is
+           converted to a C-contiguous array of this dtype on entry.
     Returns
     -------
-    implic : matrix (kxk)
+    implic : array (kxk)
              elements are the variances for the number of intervals
              required for  a chain starting in state i to first enter state j
+
+    .. versionchanged:: 0.2.3
+       Always returns an ndarray. For np.matrix input, this used to be an
+       np.matrix.
+
     Examples
     --------
     >>> import numpy as np
     >>> p=np.matrix([[.5, .25, .25],[.5,0,.5],[.25,.25,.5]])
     >>> vfm=var_fmpt(p)
     >>> vfm
-    matrix([[  5.58333333,  12.        ,   6.88888889],
-            [  6.22222222,  12.        ,   6.22222222],
-            [  6.88888889,  12.        ,   5.58333333]])
+    array([[ 5.58333333, 12.        ,  6.88888889],
+           [ 6.22222222, 12.        ,  6.22222222],
+           [ 6.88888889, 12.        ,  5.58333333]])
 
     Notes
     -----
@@ -145,19 +229,246 @@ def var_fmpt(P):
     .. [1] Kemeny, John, G. and J. Laurie Snell (1976) Finite Markov
        Chains. Springer-Verlag. Berlin
     """
-    A=P**1000
-    n,k=A.shape
-    I=np.identity(k)
-    Z=la.inv(I-P+A)
-    E=np.ones_like(Z)
-    D=np.diag(1./np.diag(A))
-    Zdg=np.diag(np.diag(Z))
-    M=(I-Z+E*Zdg)*D
-    ZM=Z*M
-    ZMdg=np.diag(np.diag(ZM))
-    W=M*(2*Zdg*D-I)+2*(ZM-E*ZMdg)
-    return W-np.multiply(M,M)
+    P=np.ascontiguousarray(P, dtype=dtype)
+    return _ergodic_stats(P, reversible=reversible)[2]
+
+def ergodic_stats(P, *, reversible=None, dtype=np.float64):
+    """
+    Steady state, first mean passage times, and their variances for an
+    ergodic transition probability matrix.
+
+    The steady state and the fundamental matrix are computed only once,
+    so this is cheaper than calling steady_state, fmpt, and var_fmpt
+    separately on the same P.
+    Parameters
+    ----------
+    P    : matrix (kxk)
+           an ergodic Markov transition probability matrix
+    reversible : bool, optional
+           if True, the fundamental matrix of large chains is obtained
+           from a Cholesky factorization of its symmetrized form; P must
+           then satisfy detailed balance, or a ValueError is raised.
+           Default (None) uses a single LU factorization that also yields
+           the steady state.
+    dtype : numpy dtype, optional
+           floating point precision of the computation. Default is
+           np.float64. For large chains (hundreds of states) the work is
+           memory-bound, and np.float32 roughly doubles throughput; it is
+           appropriate when only ~6 significant digits are needed. P is
+           converted to a C-contiguous array of this dtype on entry.
+    Returns
+    -------
+    ss   : array (k,)
+           steady state distribution
+    M    : array (kxk)
+           first mean passage times (see fmpt)
+    V    : array (kxk)
+           variances of the first mean passage times (see var_fmpt)
+    Examples
+    --------
+    >>> import numpy as np
+    >>> p=np.array([[.5, .25, .25],[.5,0,.5],[.25,.25,.5]])
+    >>> ss, M, V = ergodic_stats(p)
+    >>> ss
+    array([0.4, 0.2, 0.4])
+    >>> np.allclose(M, fmpt(p)) and np.allclose(V, var_fmpt(p))
+    True
+    """
+    P=np.ascontiguousarray(P, dtype=dtype)
+    return _ergodic_stats(P, reversible=reversible)
+
+def fmpt_batch(Ps, *, dtype=np.float64):
+    """
+    First mean passage times for a stack of ergodic transition probability
+    matrices, such as bootstrap or epoch-by-epoch estimates of one chain.
+
+    All matrices are factored in a single batched solve, so this is much
+    cheaper than calling fmpt on each of many small matrices.
+    Parameters
+    ----------
+    Ps   : array (N x k x k)
+           N ergodic Markov transition probability matrices
+    dtype : numpy dtype, optional
+           floating point precision of the computation (see fmpt). Default
+           is np.float64.
+    Returns
+    -------
+    M    : array (N x k x k)
+           M[n] holds the first mean passage times of Ps[n] (see fmpt)
+    Examples
+    --------
+    >>> import numpy as np
+    >>> p=np.array([[.5, .25, .25],[.5,0,.5],[.25,.25,.5]])
+    >>> q=np.array([[.9, .1, 0],[.1, .8, .1],[0, .1, .9]])
+    >>> M=fmpt_batch(np.stack((p, q)))
+    >>> M.shape
+    (2, 3, 3)
+    >>> np.allclose(M[0], fmpt(p)) and np.allclose(M[1], fmpt(q))
+    True
+    """
+    Ps=np.ascontiguousarray(Ps, dtype=dtype)
+    if Ps.ndim != 3 or Ps.shape[1] != Ps.shape[2]:
+        raise ValueError("Ps must be of shape (N, k, k)")
+    N, k, _ = Ps.shape
+    diag=np.arange(k)
+    # as in _fundamental, solve G^-1 = I - P + 1 u^T with u uniform, for
+    # every matrix at once; then ss^T = u^T G, and the fundamental matrix
+    # is Z = G + 1 c^T for some vector c
+    B=(1./k)-Ps
+    B[:,diag,diag]+=1.
+    G=np.linalg.solve(B, np.broadcast_to(np.identity(k, dtype=B.dtype), B.shape))
+    ss=G.mean(axis=1)
+    # M[n,i,j] = (delta_ij - Z[n,i,j] + Z[n,j,j]) / ss[n,j], in which the
+    # rank-1 term c cancels, so that G can be used in place of Z
+    d=1./ss
+    M=G[:,diag,diag][:,np.newaxis,:]-G
+    M*=d[:,np.newaxis,:]
+    M[:,diag,diag]+=d
+    return M
+
+def _ergodic_stats(P, reversible=None, variance=True):
+    """Steady state, first mean passage times, and (if variance is True,
+    else None) their variances of P."""
+    k=P.shape[0]
+    if k <= _NUMBA_MAX_K:
+        ss=steady_state(P)
+        if reversible:
+            # the kernels do not need reversibility, but reversible=True
+            # must still be rejected for chains that are not
+            _check_detailed_balance(P, ss)
+        if variance:
+            return (ss,) + _var_fmpt_core(P, ss)
+        return ss, _fmpt_core(P, ss), None
+    ss, Z, solve = _fundamental(P, reversible=reversible)
+    # the limiting matrix A has every row equal to ss, so diag(A) = ss and
+    # D = diag(A)^-1 is kept as the vector d.
+    # M[i,j] = (delta_ij - Z[i,j] + Z[j,j]) * d[j]
+    d=1./ss
+    zdg=np.diag(Z).copy()
+    # without variances Z is not needed afterwards, and M reuses its buffer
+    M=np.subtract(zdg[np.newaxis,:], Z, out=None if variance else Z)
+    M*=d[np.newaxis,:]
+    M[np.diag_indices(k)]+=d
+    if not variance:
+        return ss, M, None
+    # V = M@(2*Zdg@D-I) + 2*(ZM - diag(ZM)) - M*M; 2*Zdg@D-I is diagonal,
+    # so the product with M is a column scale, and the whole expression is
+    # evaluated in one fused pass in place in the buffer of ZM
+    V=solve(M)
+    _combine_var_fmpt(V, M, 2.*zdg*d-1.)
+    return ss, M, V
+
+@jit(nopython=True, cache=_CACHE)
+def _combine_var_fmpt(ZM, M, scale):
+    """In place, ZM <- M*scale + 2*(ZM - diag(ZM)) - M*M, in a single pass
+    over the k x k arrays (scale is broadcast along the columns)."""
+    k = ZM.shape[0]
+    zmd = np.empty(k, dtype=ZM.dtype)
+    for j in range(k):
+        zmd[j] = ZM[j, j]
+    for i in range(k):
+        for j in range(k):
+            m = M[i, j]
+            ZM[i, j] = m*(scale[j] - m) + 2*(ZM[i, j] - zmd[j])
+
+def _fundamental(P, reversible=None):
+    """Return (ss, Z, solve), where ss is the steady state of P, Z = (I - P +
+    1 ss^T)^-1 is its fundamental matrix, and solve is a function X -> Z@X.
+
+    By default, a single LU factorization of G^-1 = I - P + 1 u^T, with u
+    uniform, provides everything: ss^T = u^T G, and Z = G + 1 c^T with
+    c = ss - G^T ss, so that no separate steady state solve is needed.
+
+    If the chain is reversible, D^(1/2) P D^(-1/2) with D = diag(ss) is
+    symmetric, and so is the similarity transform of I - P + 1 ss^T, which
+    is then positive definite and can be factored by Cholesky instead.
+    """
+    k=P.shape[0]
+    I=np.identity(k, dtype=P.dtype)
+    if reversible:
+        ss=steady_state(P)
+        # cho_factor reads only one triangle of C, so a chain that is not
+        # reversible would silently give a wrong Z; check detailed balance,
+        # which is cheap next to the factorization
+        _check_detailed_balance(P, ss)
+        r=np.sqrt(ss)[:,np.newaxis]
+        C=np.outer(r, r)-r*P/r.T
+        C[np.diag_indices(k)]+=1.
+        cho=cho_factor(C)
+        solve=lambda X: cho_solve(cho, r*X)/r
+        return ss, solve(I), solve
+    B=(1./k)-P
+    B[np.diag_indices(k)]+=1.
+    lu=lu_factor(B, overwrite_a=True)
+    Z=lu_solve(lu, I)
+    ss=Z.mean(axis=0)
+    c=ss-ss@Z
+    Z+=c[np.newaxis,:]
+    return ss, Z, lambda X: lu_solve(lu, X)+(c@X)[np.newaxis,:]
+
+def _check_detailed_balance(P, ss):
+    """Raise ValueError unless ss[i]*P[i,j] == ss[j]*P[j,i] for all i, j
+    (to within rounding), i.e., unless the chain P is reversible."""
+    F=ss[:,np.newaxis]*P
+    if np.abs(F-F.T).max() > np.sqrt(np.finfo(F.dtype).eps)*np.abs(F).max():
+        raise ValueError("P does not satisfy detailed balance; "
+                         "use reversible=None for general chains")
 
+@jit(nopython=True, cache=_CACHE)
+def _steady_state_core(P):
+    """Steady state distribution of P (see steady_state)."""
+    k = P.shape[0]
+    A = np.empty((k, k), dtype=P.dtype)
+    for i in range(k - 1):
+        for j in range(k):
+            A[i, j] = P[j, i]
+        A[i, i] -= 1.0
+    A[k - 1, :] = 1.0
+    b = np.zeros(k, dtype=P.dtype)
+    b[k - 1] = 1.0
+    return np.linalg.solve(A, b)
+
+@jit(nopython=True, cache=_CACHE)
+def _fmpt_core(P, ss):
+    """First mean passage times of P, given its steady state ss."""
+    k = ss.shape[0]
+    IPA = np.empty((k, k), dtype=P.dtype)
+    for i in range(k):
+        for j in range(k):
+            IPA[i, j] = ss[j] - P[i, j]
+        IPA[i, i] += 1.0
+    Z = np.linalg.solve(IPA, np.identity(k, dtype=P.dtype))
+    M = np.empty((k, k), dtype=P.dtype)
+    for i in range(k):
+        for j in range(k):
+            M[i, j] = (Z[j, j] - Z[i, j]) / ss[j]
+        M[i, i] += 1.0 / ss[i]
+    return M
+
+@jit(nopython=True, cache=_CACHE)
+def _var_fmpt_core(P, ss):
+    """First mean passage times of P and their variances, given its
+    steady state ss."""
+    k = ss.shape[0]
+    IPA = np.empty((k, k), dtype=P.dtype)
+    for i in range(k):
+        for j in range(k):
+            IPA[i, j] = ss[j] - P[i, j]
+        IPA[i, i] += 1.0
+    Z = np.linalg.solve(IPA, np.identity(k, dtype=P.dtype))
+    M = np.empty((k, k), dtype=P.dtype)
+    for i in range(k):
+        for j in range(k):
+            M[i, j] = (Z[j, j] - Z[i, j]) / ss[j]
+        M[i, i] += 1.0 / ss[i]
+    ZM = Z @ M
+    V = np.empty((k, k), dtype=P.dtype)
+    for i in range(k):
+        for j in range(k):
+            V[i, j] = (M[i, j]*(2*Z[j, j]/ss[j] - 1)
+                       + 2*(ZM[i, j] - ZM[j, j])
+                       - M[i, j]*M[i, j])
+    return M, V
 
 def _test():
     import doctest
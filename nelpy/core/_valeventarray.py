@@ -66,11 +66,13 @@ BaseValueEventArray (ABC)
 """
 
 import logging
+import warnings
 import numpy as np
 import copy
 import numbers
 
 from abc import ABC, abstractmethod
+from numba import jit
 
 from .. import core
 from .. import utils
@@ -78,6 +80,283 @@ from .. import version
 
 from ..utils_.decorators import keyword_equivalence
 
+# The kernels below are compiled by numba on first use, not at import. The
+# first construction of a ValueEventArray (or StatefulValueEventArray) in a
+# fresh installation therefore takes a few seconds longer, while the kernels
+# it needs are compiled; cache=True then stores them on disk (in the
+# __pycache__ next to this file), so later processes load them instead.
+
+@jit(nopython=True, cache=True)
+def _restrict_csr(times, values, offsets, starts, stops):
+    """Restrict flat (CSR-style) event data to the intervals [starts, stops).
+
+    Each series must be sorted. A first (counting) pass binary searches the
+    interval boundaries in every series, so that the output buffers can be
+    preallocated; the second pass copies the kept [lo, hi) spans as whole
+    slices. There is no per-event test. The per-series loops are too short
+    for threading to pay off, so both passes run serially.
+
+    Returns
+    -------
+    times, values, offsets : the restricted flat event data
+    """
+    n_series = offsets.size - 1
+    n_intervals = starts.size
+    frm = np.empty((n_series, n_intervals), dtype=np.int64)
+    to = np.empty((n_series, n_intervals), dtype=np.int64)
+    counts = np.zeros(n_series + 1, dtype=np.int64)
+    for ss in range(n_series):
+        t = times[offsets[ss]:offsets[ss+1]]
+        count = 0
+        # the bounds of a (merged) support are sorted, so each search only
+        # has to look past the previous result; fall back to a full search
+        # whenever a bound steps backwards (overlapping intervals)
+        lo = 0
+        prev = -np.inf
+        for ii in range(n_intervals):
+            if starts[ii] < prev:
+                lo = 0
+            lo += np.searchsorted(t[lo:], starts[ii])
+            hi = lo + np.searchsorted(t[lo:], stops[ii])
+            frm[ss, ii] = offsets[ss] + lo
+            to[ss, ii] = offsets[ss] + hi
+            count += hi - lo
+            lo = hi
+            prev = stops[ii]
+        counts[ss+1] = count
+    new_offsets = np.cumsum(counts)
+    new_times = np.empty(new_offsets[-1], dtype=times.dtype)
+    new_values = np.empty((new_offsets[-1], values.shape[1]), dtype=values.dtype)
+    for ss in range(n_series):
+        pos = new_offsets[ss]
+        for ii in range(n_intervals):
+            n_kept = to[ss, ii] - frm[ss, ii]
+            new_times[pos:pos+n_kept] = times[frm[ss, ii]:to[ss, ii]]
+            new_values[pos:pos+n_kept] = values[frm[ss, ii]:to[ss, ii]]
+            pos += n_kept
+    return new_times, new_values, new_offsets
+
+@jit(nopython=True, cache=True)
+def _last_event_index(times, offsets, queries):
+    """Return, for every series and query time, the (flat) index of the last
+    event at or before the query (or of the first event of the series, if
+    there is none)."""
+    n_series = offsets.size - 1
+    out = np.empty((n_series, queries.size), dtype=np.int64)
+    for ss in range(n_series):
+        t = times[offsets[ss]:offsets[ss+1]]
+        for qq in range(queries.size):
+            out[ss, qq] = offsets[ss] + max(np.searchsorted(t, queries[qq], side='right') - 1, 0)
+    return out
+
+@jit(nopython=True, cache=True)
+def _merge_pseudo_events(times, kinds, states, ptimes, pkinds, pstates):
+    """Merge pseudo events into the sorted events of a single series.
+
+    A pseudo event is skipped if an event (or an earlier pseudo event) with
+    the same time already exists. The pseudo events need not be sorted; a
+    stable sort keeps the first of any duplicates.
+
+    Returns
+    -------
+    times, kinds, states : the merged (sorted) event data
+    """
+    n_events = times.size
+    n_total = n_events + ptimes.size
+    out_times = np.empty(n_total, dtype=np.float64)
+    out_kinds = np.empty(n_total, dtype=np.float64)
+    out_states = np.empty((n_total, states.shape[1]), dtype=np.float64)
+    ii = 0
+    pos = 0
+    for jj in np.argsort(ptimes, kind='mergesort'):
+        tt = ptimes[jj]
+        while ii < n_events and times[ii] <= tt:
+            out_times[pos] = times[ii]
+            out_kinds[pos] = kinds[ii]
+            out_states[pos] = states[ii]
+            pos += 1
+            ii += 1
+        if pos > 0 and out_times[pos-1] == tt:
+            continue
+        out_times[pos] = tt
+        out_kinds[pos] = pkinds[jj]
+        out_states[pos] = pstates[jj]
+        pos += 1
+    while ii < n_events:
+        out_times[pos] = times[ii]
+        out_kinds[pos] = kinds[ii]
+        out_states[pos] = states[ii]
+        pos += 1
+        ii += 1
+    return out_times[:pos], out_kinds[:pos], out_states[:pos]
+
+def _pseudo_event_states(times, states, offsets, ptimes):
+    """Return the states carried by pseudo events at times ptimes in every
+    series of flat event data, as an array of shape (n_series, n_pseudo,
+    n_states): the state of the last event at or before each pseudo event
+    (or of the first event, if there is none). Series without any events
+    have no state to carry, and get NaN."""
+    n_series = offsets.size - 1
+    if times.size == 0:
+        return np.full((n_series, ptimes.size, states.shape[1]), np.nan)
+    idx = _last_event_index(times, offsets, ptimes)
+    # the index of an empty series points into its neighbor (or past the end)
+    empty = offsets[1:] == offsets[:-1]
+    idx[empty] = 0
+    pstates = states[idx]
+    pstates[empty] = np.nan
+    return pstates
+
+def _merge_flat_pseudo_events(times, kinds, states, offsets, ptimes, pkinds, pstates):
+    """Merge the pseudo events (ptimes, pkinds) into every series of flat
+    event data (see _merge_pseudo_events), where pstates[ss] holds the states
+    of the pseudo events of series ss.
+
+    Returns
+    -------
+    times, values, offsets : the merged flat event data, where the first
+        column of values holds the event kinds
+    """
+    n_series = offsets.size - 1
+    merged_times = []
+    merged_values = []
+    new_offsets = np.zeros(n_series + 1, dtype=np.int64)
+    for ss in range(n_series):
+        lo, hi = offsets[ss], offsets[ss+1]
+        tt, kk, st = _merge_pseudo_events(
+            times[lo:hi], kinds[lo:hi], states[lo:hi], ptimes, pkinds, pstates[ss])
+        merged_times.append(tt)
+        merged_values.append(np.column_stack((kk, st)))
+        new_offsets[ss+1] = new_offsets[ss] + tt.size
+    new_times = np.concatenate(merged_times + [np.zeros(0)])
+    new_values = np.concatenate(merged_values + [np.zeros((0, states.shape[1] + 1))])
+    return new_times, new_values, new_offsets
+
+def _as_series_array(series):
+    """Stack a list of per-series arrays into an ndarray, falling back to a
+    ragged (object) array when the series differ in shape."""
+    if len({np.shape(ss) for ss in series}) > 1:
+        return utils.ragged_array(series)
+    return np.asarray(series)
+
+def _is_singletons(data):
+    """Returns True if data is a list of singletons (more than one)."""
+    data = np.array(data)
+    try:
+        if data.shape[-1] < 2 and np.max(data.shape) > 1:
+            return True
+        if max(np.array(data).shape[:-1]) > 1 and data.shape[-1] == 1:
+            return True
+    except (IndexError, TypeError, ValueError):
+        return False
+    return False
+
+def _is_single_series(data):
+    """Returns True if data represents event datas from a single series.
+
+    Examples
+    ========
+    [1, 2, 3]           : True
+    [[1, 2, 3]]         : True
+    [[1, 2, 3], []]     : False
+    [[], [], []]        : False
+    [[[[1, 2, 3]]]]     : True
+    [[[[[1],[2],[3]]]]] : False
+    """
+    try:
+        if isinstance(data[0][0], list) or isinstance(data[0][0], np.ndarray):
+            logging.info("event datas input has too many layers!")
+            try:
+                if max(np.array(data).shape[:-1]) > 1:
+                    # singletons = True
+                    return False
+            except ValueError:
+                return False
+            data = np.squeeze(data)
+    except (IndexError, TypeError):
+        pass
+    try:
+        if isinstance(data[1], list) or isinstance(data[1], np.ndarray):
+            return False
+    except (IndexError, TypeError):
+        pass
+    return True
+
+def _as_numeric_array(data):
+    """Returns data as an array (keeping its numeric dtype) if it is uniform
+    (non-ragged) and numeric, and None otherwise."""
+    if isinstance(data, np.ndarray) and data.dtype == np.dtype('O'):
+        return None
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            data = np.asarray(data)
+    except (ValueError, TypeError):
+        return None
+    if data.dtype.kind not in 'biuf':
+        return None
+    return data
+
+def _standardize_to_2d(data):
+    """Standardize event (or value) input to an array of series: either a
+    uniform numeric array, or a ragged (object) array of per-series arrays.
+    Shared by the ValueEventArray and StatefulValueEventArray constructors."""
+    # fast paths for uniform numeric input, for which none of the
+    # structure sniffing below changes the shape:
+    #   (n_events,) --> (1, n_events)
+    #   (n_series, n_events) --> unchanged
+    #   (n_series, n_events, n_values), no unit dims --> unchanged
+    arr = _as_numeric_array(data)
+    if arr is not None:
+        if arr.ndim == 1:
+            return arr.reshape(1, -1)
+        if arr.ndim == 2 or (arr.ndim == 3 and min(arr.shape) > 1):
+            return arr
+    if _is_single_series(data):
+        return np.array(np.squeeze(data), ndmin=2)
+    if _is_singletons(data):
+        data = np.squeeze(data)
+        n = np.max(data.shape)
+        if len(data.shape) == 1:
+            m = 1
+        else:
+            m = np.min(data.shape)
+        data = np.reshape(data, (n,m))
+    else:
+        data = np.squeeze(data)
+        if data.dtype == np.dtype('O'):
+            jagged = True
+        else:
+            jagged = False
+        if jagged:  # jagged array
+            # standardize input so that a list of lists is converted
+            # to an array of arrays:
+            ragged = np.empty(len(data), dtype=object)
+            for ii, st in enumerate(data):
+                ragged[ii] = np.array(st, ndmin=1, copy=False)
+            data = ragged
+        else:
+            data = np.array(data, ndmin=2)
+    return data
+
+def _standardize_values_to_2d(data):
+    """Standardize value input like _standardize_to_2d, and check that every
+    event in a series has the same number of values."""
+    data = _standardize_to_2d(data)
+    if data.dtype != np.dtype('O'):
+        # uniform numeric input: every event has a fixed number
+        # of values by construction
+        return data
+    for ii, series in enumerate(data):
+        if len(series.shape) == 2 or series.dtype != np.dtype('O'):
+            # numeric series have a fixed number of values per event
+            pass
+        else:
+            for xx in series:
+                if len(np.atleast_1d(xx)) > 1:
+                    raise ValueError('each series must have a fixed number of values; mismatch in series {}'.format(ii))
+    return data
+
 class IntervalSeriesSlicer(object):
     def __init__(self):
         pass
@@ -105,6 +384,10 @@ class IntervalSeriesSlicer(object):
 
         return intervalslice, seriesslice
 
+# IntervalSeriesSlicer is stateless, so a single instance is shared by all
+# of the indexers below
+_interval_series_slicer = IntervalSeriesSlicer()
+
 class ItemGetter_loc(object):
     """.loc is primarily label based (that is, series_id based)
 
@@ -124,7 +407,7 @@ class ItemGetter_loc(object):
 
     def __getitem__(self, idx):
         """intervals, series"""
-        intervalslice, seriesslice = IntervalSeriesSlicer()[idx]
+        intervalslice, seriesslice = _interval_series_slicer[idx]
 
         # first convert series slice into list
         if isinstance(seriesslice, slice):
@@ -135,15 +418,15 @@ class ItemGetter_loc(object):
                 if start is None:
                     istart = 0
                 else:
-                    istart = self.obj._series_ids.index(start)
-            except ValueError:
+                    istart = self.obj._series_id_index[start]
+            except KeyError:
                 raise KeyError('series_id {} could not be found in BaseEventArray!'.format(start))
             try:
                 if stop is None:
                     istop = self.obj.n_series
                 else:
-                    istop = self.obj._series_ids.index(stop) + 1
-            except ValueError:
+                    istop = self.obj._series_id_index[stop] + 1
+            except KeyError:
                 raise KeyError('series_id {} could not be found in BaseEventArray!'.format(stop))
             if istep is None:
                 istep = 1
@@ -157,8 +440,8 @@ class ItemGetter_loc(object):
             seriesslice = np.atleast_1d(seriesslice)
             for series in seriesslice:
                 try:
-                    uidx = self.obj.series_ids.index(series)
-                except ValueError:
+                    uidx = self.obj._series_id_index[series]
+                except KeyError:
                     raise KeyError("series_id {} could not be found in BaseEventArray!".format(series))
                 else:
                     series_idx_list.append(uidx)
@@ -166,26 +449,16 @@ class ItemGetter_loc(object):
         if not isinstance(series_idx_list, list):
             series_idx_list = list(series_idx_list)
 
-        out = copy.copy(self.obj)
-        try:
-            out._data = out._data[[series_idx_list]]
-            singleseries = len(out._data)==1
-        except AttributeError:
-            out._data = out._data[[series_idx_list]]
-            singleseries = len(out._data)==1
-
-        if singleseries:
-            out._data = np.array([out._data[0]], ndmin=2)
-        out._series_ids = list(np.atleast_1d(np.atleast_1d(out._series_ids)[[series_idx_list]]))
+        out = self.obj._shallow()
+        out._take_series(series_idx_list)
+        out.series_ids = [out._series_ids[ii] for ii in series_idx_list]
         # TODO: update tags
         if isinstance(intervalslice, slice):
             if intervalslice.start == None and intervalslice.stop == None and intervalslice.step == None:
-                out.loc = ItemGetter_loc(out)
-                out.iloc = ItemGetter_iloc(out)
+                out.__renew__()
                 return out
         out = out._intervalslicer(intervalslice)
-        out.loc = ItemGetter_loc(out)
-        out.iloc = ItemGetter_iloc(out)
+        out.__renew__()
         return out
 
 class ItemGetter_iloc(object):
@@ -206,25 +479,20 @@ class ItemGetter_iloc(object):
 
     def __getitem__(self, idx):
         """intervals, series"""
-        intervalslice, seriesslice = IntervalSeriesSlicer()[idx]
-        out = copy.copy(self.obj)
+        intervalslice, seriesslice = _interval_series_slicer[idx]
+        out = self.obj._shallow()
         if isinstance(seriesslice, int):
             seriesslice = [seriesslice]
-        out._data = out._data[[seriesslice]]
-        singleseries = len(out._data)==1
-        if singleseries:
-            out._data = np.array(out._data[[0]], ndmin=2)
-        out._series_ids = list(np.atleast_1d(np.atleast_1d(out._series_ids)[seriesslice]))
+        series_idx = out._take_series(seriesslice)
+        out.series_ids = [out._series_ids[ii] for ii in series_idx]
 
         # TODO: update tags
         if isinstance(intervalslice, slice):
             if intervalslice.start == None and intervalslice.stop == None and intervalslice.step == None:
-                out.loc = ItemGetter_loc(out)
-                out.iloc = ItemGetter_iloc(out)
+                out.__renew__()
                 return out
         out = out._intervalslicer(intervalslice)
-        out.loc = ItemGetter_loc(out)
-        out.iloc = ItemGetter_iloc(out)
+        out.__renew__()
         return out
 
 ########################################################################
@@ -233,10 +501,16 @@ class ItemGetter_iloc(object):
 class BaseValueEventArray(ABC):
     """Base class for ValueEventArray and BinnedValueEventArray.
 
+    Event data are stored in a flat (CSR-style) layout, with all series
+    concatenated:
+        _times   : np.array of shape (n_total_events,), event times
+        _values  : np.array of shape (n_total_events, n_cols), event values
+        _offsets : np.array of shape (n_series + 1,), so that the events of
+                   series i are _times[_offsets[i]:_offsets[i+1]]
     """
 
     __aliases__ = {}
-    __attributes__ = ["_fs", "_series_ids"]
+    __attributes__ = ["_fs", "_series_ids", "_series_id_index"]
 
     def __init__(self, *, fs=None, series_ids=None, empty=False, abscissa=None, ordinate=None, **kwargs):
 
@@ -257,7 +531,7 @@ class BaseValueEventArray(ABC):
         # if an empty object is requested, return it:
         if empty:
             for attr in self.__attributes__:
-                exec("self." + attr + " = None")
+                setattr(self, attr, None)
             self._abscissa.support = type(self._abscissa.support)(empty=True)
             self.loc = ItemGetter_loc(self)
             self.iloc = ItemGetter_iloc(self)
@@ -277,8 +551,7 @@ class BaseValueEventArray(ABC):
         if series_ids is None:
             series_ids = list(range(1,self.n_series + 1))
 
-        series_ids = np.array(series_ids, ndmin=1)  # standardize series_ids
-
+        # the setter standardizes (and validates) series_ids
         self.series_ids = series_ids
 
         self.loc = ItemGetter_loc(self)
@@ -321,18 +594,16 @@ class BaseValueEventArray(ABC):
     @property
     def isempty(self):
         """(bool) Empty EventArray."""
-        try:
-            return np.sum([len(st) for st in self.data]) == 0
-        except TypeError:
-            return True  # this happens when self.data == None
+        if self._offsets is None:
+            return True
+        return self._offsets[-1] == 0
 
     @property
     def n_series(self):
         """(int) The number of series."""
-        try:
-            return utils.PrettyInt(len(self.data))
-        except TypeError:
+        if self._offsets is None:
             return 0
+        return utils.PrettyInt(len(self._offsets) - 1)
 
     @abstractmethod
     def n_values(self):
@@ -351,55 +622,266 @@ class BaseValueEventArray(ABC):
         """Unit IDs contained in the BaseEventArray."""
         return self._series_ids
 
+    def _shallow(self):
+        """Return a shallow clone of self that shares all attributes.
+
+        Callers must re-attach the slicers (see __renew__)."""
+        out = type(self).__new__(type(self))
+        out.__dict__ = self.__dict__.copy()
+        return out
+
     def _copy_without_data(self):
         """Return a copy of self, without event datas."""
-        out = copy.copy(self) # shallow copy
+        # deep copy only the (small) metadata, never the event data; the
+        # slicers are re-attached rather than copied
+        skip = ('_times', '_values', '_offsets', '_data_cache', 'loc', 'iloc')
+        state = {key: val for key, val in self.__dict__.items() if key not in skip}
+        out = type(self).__new__(type(self))
+        out.__dict__.update(copy.deepcopy(state))
         out._data = None
-        out = copy.deepcopy(out) # just to be on the safe side, but at least now we are not copying the data!
+        out.__renew__()
         return out
 
     def copy(self):
         """Returns a copy of the EventArray."""
-        newcopy = copy.deepcopy(self)
-        newcopy.__renew__()
+        newcopy = self._copy_without_data()
+        if self._offsets is not None:
+            newcopy._times = self._times.copy()
+            newcopy._values = self._values.copy()
+            newcopy._offsets = self._offsets.copy()
         return newcopy
 
     @property
     def data(self):
-        """Event datas in seconds."""
+        """Event datas in seconds, as a ragged array of length n_series,
+        each entry of shape (n_events, 1 + n_cols), with columns
+        [time, values...].
+
+        NOTE: this is a read-only copy of the flat event data. It is built
+        at O(n_events) cost on first access, and cached until the event
+        data change. Assigning to it (or to any of its entries) raises a
+        ValueError; to modify event data, construct a new array instead.
+        """
         return self._data
 
+    @property
+    def _data(self):
+        """Ragged array of length n_series, each entry of shape
+        (n_events, 1 + n_cols), with columns [time, values...].
+
+        This is built from (and, when set, decomposed into) the flat
+        _times, _values and _offsets arrays. It is a read-only copy of
+        them, cached until any of them is reassigned (see __setattr__).
+        """
+        if self._offsets is None:
+            return None
+        data = self.__dict__.get('_data_cache')
+        if data is None:
+            times, values, offsets = self._times, self._values, self._offsets
+            data = utils.ragged_array(
+                [np.column_stack((times[start:stop], values[start:stop]))
+                    for start, stop in zip(offsets[:-1], offsets[1:])])
+            # in-place edits would be silently lost (the flat arrays are
+            # the actual storage), so make them fail loudly instead
+            for series in data:
+                series.flags.writeable = False
+            data.flags.writeable = False
+            self._data_cache = data
+        return data
+
+    @_data.setter
+    def _data(self, val):
+        if val is None:
+            self._times = None
+            self._values = None
+            self._offsets = None
+            return
+        data = [np.asarray(series) for series in val]
+        n_cols = None
+        for series in data:
+            if series.ndim == 2:
+                n_cols = series.shape[1] - 1
+                if series.size:
+                    break
+        if n_cols is None:
+            n_cols = 0
+        lengths = np.zeros(len(data)+1, dtype=np.int64)
+        times = []
+        values = []
+        for ii, series in enumerate(data):
+            if series.size == 0:
+                continue
+            series = series.reshape(-1, n_cols + 1)
+            lengths[ii+1] = series.shape[0]
+            times.append(series[:,0])
+            values.append(series[:,1:])
+        self._offsets = np.cumsum(lengths)
+        if times:
+            self._times = np.concatenate(times).astype(np.float64, copy=False)
+            self._values = np.concatenate(values)
+        else:
+            self._times = np.zeros(0)
+            self._values = np.zeros((0, n_cols))
+
+    def _take_series(self, series_idx):
+        """Restrict the flat event data to the series at the integer
+        positions (or slice) series_idx, in that order.
+
+        Returns the integer positions of the series that were kept.
+        """
+        offsets = self._offsets
+        n_series = 0 if offsets is None else len(offsets) - 1
+        series_idx = np.atleast_1d(np.arange(n_series)[series_idx])
+        if offsets is None:
+            return series_idx
+        if series_idx.size and np.all(np.diff(series_idx) == 1):
+            # contiguous run of series: zero-copy views
+            lo = offsets[series_idx[0]]
+            hi = offsets[series_idx[-1] + 1]
+            self._times = self._times[lo:hi]
+            self._values = self._values[lo:hi]
+            self._offsets = offsets[series_idx[0]:series_idx[-1] + 2] - lo
+            return series_idx
+        starts = offsets[series_idx]
+        stops = offsets[series_idx + 1]
+        idx = np.concatenate(
+            [np.arange(start, stop) for start, stop in zip(starts, stops)]
+            + [np.zeros(0, dtype=np.int64)])
+        self._times = self._times[idx]
+        self._values = self._values[idx]
+        self._offsets = np.concatenate(([0], np.cumsum(stops - starts)))
+        return series_idx
+
+    @staticmethod
+    def _flatten_event_data(events, values):
+        """Return (times, values, offsets) in the flat layout from per-series
+        events and values, sorting each series by event time (but only if
+        necessary). Event times are stored as float64, while values keep
+        their (common) numeric dtype."""
+        events = [np.asarray(a, dtype=np.float64).ravel() for a in events]
+        values = [np.asarray(v) for v in values]
+        n_values = None
+        for ii, (a, v) in enumerate(zip(events, values)):
+            # every event needs one row of values (a single value per event
+            # may also be given as a flat array)
+            n_rows = v.shape[0] if v.ndim else 1
+            if n_rows != a.size and v.size:
+                raise ValueError(
+                    'series {} has {} events, but values for {} events'.format(
+                        ii, a.size, n_rows))
+            if not a.size:
+                continue
+            n_cols = v.size // a.size
+            if n_values is None:
+                n_values = n_cols
+            elif n_cols != n_values:
+                raise ValueError(
+                    'every event must have the same number of values; series '
+                    '{} has {} values per event, not {}'.format(ii, n_cols, n_values))
+        if n_values is None:
+            n_values = 0
+        dtype = np.result_type(*values) if values else np.float64
+        offsets = np.zeros(len(events)+1, dtype=np.int64)
+        np.cumsum([a.size for a in events], out=offsets[1:])
+        times = np.concatenate(events + [np.zeros(0)])
+        values = np.concatenate(
+            [v.reshape(a.size, n_values) for a, v in zip(events, values)]
+            + [np.zeros((0, n_values), dtype=dtype)])
+
+        # segmented sort: find the series with any decreasing step (steps
+        # across series boundaries don't count), and sort only those
+        decreasing = np.diff(times) < 0
+        boundaries = offsets[1:-1] - 1
+        decreasing[boundaries[(boundaries >= 0) & (boundaries < decreasing.size)]] = False
+        unsorted = np.unique(
+            np.searchsorted(offsets, np.flatnonzero(decreasing), side='right') - 1)
+        for series in unsorted:
+            start, stop = offsets[series], offsets[series+1]
+            sortidx = start + np.argsort(times[start:stop], kind='stable')
+            times[start:stop] = times[sortidx]
+            values[start:stop] = values[sortidx]
+        return times, values, offsets
+
+    @staticmethod
+    def _restrict_to_interval_array_fast(intervalarray, data, quiet=False):
+        """Return data restricted to an IntervalArray.
+
+        This function assumes sorted event datas, so that binary search can
+        be used to quickly identify slices that should be kept in the
+        restriction. It does not check every event data.
+
+        Parameters
+        ----------
+        intervalarray : IntervalArray or EpochArray
+        data : tuple (times, values, offsets) of flat event data.
+        quiet : bool, optional
+            If True, do not log that events outside of the intervals were
+            ignored (e.g., when slicing, where that is the point).
+
+        Returns
+        -------
+        data : tuple (times, values, offsets) of restricted flat event data.
+            If a single interval spans every event, this is data itself,
+            and its arrays are shared rather than copied. That is safe since
+            the flat event arrays are never modified in place, only replaced.
+        """
+        times, values, offsets = data
+        if offsets is None:
+            return data
+        if intervalarray.isempty:
+            return (np.zeros(0), np.zeros((0, values.shape[1]), dtype=values.dtype),
+                    np.zeros_like(offsets))
+
+        starts = np.ascontiguousarray(intervalarray.starts, dtype=np.float64)
+        stops = np.ascontiguousarray(intervalarray.stops, dtype=np.float64)
+        # common case: a single interval that already spans every event,
+        # which only needs the first and last event of each series checked
+        if starts.size == 1:
+            nonempty = np.diff(offsets) > 0
+            first = times[offsets[:-1][nonempty]]
+            last = times[offsets[1:][nonempty] - 1]
+            if np.all(first >= starts[0]) and np.all(last < stops[0]):
+                return data
+        data = _restrict_csr(times, values, offsets, starts, stops)
+        if not quiet and logging.getLogger().isEnabledFor(logging.INFO):
+            if data[0].size < times.size:
+                logging.info('ignoring events outside of eventarray support')
+        return data
+
     @property
     def first_event(self):
         """Returns the [time of the] first event across all series."""
-        first = np.inf
-        for series in self.data:
-            if series[0,0] < first:
-                first = series[0,0]
-        return first
+        offsets = self._offsets
+        nonempty = np.diff(offsets) > 0
+        if not nonempty.any():
+            return np.inf
+        return self._times[offsets[:-1][nonempty]].min()
 
     @property
     def last_event(self):
         """Returns the [time of the] last event across all series."""
-        last = -np.inf
-        for series in self.data:
-            if series[-1,0] > last:
-                last = series[-1,0]
-        return last
+        offsets = self._offsets
+        nonempty = np.diff(offsets) > 0
+        if not nonempty.any():
+            return -np.inf
+        return self._times[offsets[1:][nonempty] - 1].max()
 
     @series_ids.setter
     def series_ids(self, val):
-        if len(val) != self.n_series:
+        val = np.asarray(val).ravel()
+        if val.size != self.n_series:
             raise TypeError("series_ids must be of length n_series")
-        elif len(set(val)) < len(val):
+        try:
+            # cast to int:
+            series_ids = val.astype(np.int64, casting='unsafe')
+        except TypeError:
+            raise TypeError("series_ids must be int-like")
+        if np.unique(series_ids).size < series_ids.size:
             raise TypeError("duplicate series_ids are not allowed")
-        else:
-            try:
-                # cast to int:
-                series_ids = [int(id) for id in val]
-            except TypeError:
-                raise TypeError("series_ids must be int-like")
+        series_ids = series_ids.tolist()
         self._series_ids = series_ids
+        # series_id --> position, for O(1) label lookups in .loc
+        self._series_id_index = dict(zip(series_ids, range(len(series_ids))))
 
     @property
     def support(self):
@@ -419,10 +901,10 @@ class BaseValueEventArray(ABC):
         else:
             raise TypeError('support must be of type {}'.format(str(type(self._abscissa.support))))
         # restrict data to new support
-        self._data = self._restrict_to_interval_array_fast(
+        self._times, self._values, self._offsets = \
+            self._restrict_to_interval_array_fast(
                 intervalarray=self._abscissa.support,
-                data=self.data,
-                copyover=True
+                data=(self._times, self._values, self._offsets)
                 )
 
     @property
@@ -441,10 +923,10 @@ class BaseValueEventArray(ABC):
         else:
             raise TypeError('support must be of type {}'.format(str(type(self._abscissa.support))))
         # restrict data to new support
-        self._data = self._restrict_to_interval_array_fast(
+        self._times, self._values, self._offsets = \
+            self._restrict_to_interval_array_fast(
                 intervalarray=self._abscissa.support,
-                data=self.data,
-                copyover=True
+                data=(self._times, self._values, self._offsets)
                 )
 
     @property
@@ -495,6 +977,9 @@ class BaseValueEventArray(ABC):
     def __setattr__(self, name, value):
         # https://stackoverflow.com/questions/4017572/how-can-i-make-an-alias-to-a-non-function-member-attribute-in-a-python-class
         name = self.__aliases__.get(name, name)
+        if name in ('_times', '_values', '_offsets'):
+            # the cached ragged _data is stale once the flat data change
+            self.__dict__.pop('_data_cache', None)
         object.__setattr__(self, name, value)
 
     def __getattr__(self, name):
@@ -520,6 +1005,11 @@ class BaseValueEventArray(ABC):
         veva = nel.ValueEventArray(events=..., values=... )
         """
 
+        # fast path: canonical kwargs only, so there is nothing to resolve
+        if ('events' in kwargs and 'values' in kwargs
+                and not kwargs.keys() & {'abscissa_vals', 'timestamps', 'time', 'data', 'marks'}):
+            return kwargs
+
         def only_one_of(*args):
             num_non_null_args = 0
             out = None
@@ -591,9 +1081,15 @@ class ValueEventArray(BaseValueEventArray):
         Information pertaining to the source of the eventarray.
     meta : dict
         Metadata associated with eventseries.
+
+    Notes
+    -----
+    Restriction to the support uses numba-compiled kernels. The first
+    construction in a fresh installation compiles them, which takes a few
+    seconds; the compiled kernels are cached on disk for later sessions.
     """
 
-    __attributes__ = ["_data"]
+    __attributes__ = ["_times", "_values", "_offsets"]
     __attributes__.extend(BaseValueEventArray.__attributes__)
     def __init__(self, events=None, values=None, *, fs=None, support=None,
                  series_ids=None, empty=False, **kwargs):
@@ -615,11 +1111,15 @@ class ValueEventArray(BaseValueEventArray):
         values =  kwargs.pop('values', None)
         #############################################
 
+        if not empty and events is not None and values is None:
+            raise ValueError('values are required for every event; use an '
+                             'EventArray for events without values')
+
         # if an empty object is requested, return it:
         if empty:
             super().__init__(empty=True)
             for attr in self.__attributes__:
-                exec("self." + attr + " = None")
+                setattr(self, attr, None)
             self._abscissa.support = type(self._abscissa.support)(empty=True)
             return
 
@@ -628,114 +1128,25 @@ class ValueEventArray(BaseValueEventArray):
             fs = 30000
             logging.info("No sampling rate was specified! Assuming default of {} Hz.".format(fs))
 
-        def is_singletons(data):
-            """Returns True if data is a list of singletons (more than one)."""
-            data = np.array(data)
-            try:
-                if data.shape[-1] < 2 and np.max(data.shape) > 1:
-                    return True
-                if max(np.array(data).shape[:-1]) > 1 and data.shape[-1] == 1:
-                    return True
-            except (IndexError, TypeError, ValueError):
-                return False
-            return False
-
-        def is_single_series(data):
-            """Returns True if data represents event datas from a single series.
-
-            Examples
-            ========
-            [1, 2, 3]           : True
-            [[1, 2, 3]]         : True
-            [[1, 2, 3], []]     : False
-            [[], [], []]        : False
-            [[[[1, 2, 3]]]]     : True
-            [[[[[1],[2],[3]]]]] : False
-            """
-            try:
-                if isinstance(data[0][0], list) or isinstance(data[0][0], np.ndarray):
-                    logging.info("event datas input has too many layers!")
-                    try:
-                        if max(np.array(data).shape[:-1]) > 1:
-            #                 singletons = True
-                            return False
-                    except ValueError:
-                        return False
-                    data = np.squeeze(data)
-            except (IndexError, TypeError):
-                pass
-            try:
-                if isinstance(data[1], list) or isinstance(data[1], np.ndarray):
-                    return False
-            except (IndexError, TypeError):
-                pass
-            return True
-
-        def standardize_to_2d(data):
-            if is_single_series(data):
-                return np.array(np.squeeze(data), ndmin=2)
-            if is_singletons(data):
-                data = np.squeeze(data)
-                n = np.max(data.shape)
-                if len(data.shape) == 1:
-                    m = 1
-                else:
-                    m = np.min(data.shape)
-                data = np.reshape(data, (n,m))
-            else:
-                data = np.squeeze(data)
-                if data.dtype == np.dtype('O'):
-                    jagged = True
-                else:
-                    jagged = False
-                if jagged:  # jagged array
-                    # standardize input so that a list of lists is converted
-                    # to an array of arrays:
-                    data = utils.ragged_array(
-                        [np.array(st, ndmin=1, copy=False) for st in data])
-                else:
-                    data = np.array(data, ndmin=2)
-            return data
-
-        def standardize_values_to_2d(data):
-            data = standardize_to_2d(data)
-            for ii, series in enumerate(data):
-                if len(series.shape) == 2:
-                    pass
-                else:
-                    for xx in series:
-                        if len(np.atleast_1d(xx)) > 1:
-                            raise ValueError('each series must have a fixed number of values; mismatch in series {}'.format(ii))
-            return data
-
-        events = standardize_to_2d(events)
-        values = standardize_values_to_2d(values)
-
-        data = []
-        for a, v in zip(events, values):
-            data.append(np.vstack((a, v.T)).T)
-        data = np.array(data)
+        events = _standardize_to_2d(events)
+        values = _standardize_values_to_2d(values)
 
-        #sort event series, but only if necessary:
-        for ii, train in enumerate(events):
-            if not utils.is_sorted(train):
-                sortidx = np.argsort(train)
-                data[ii] = (data[ii])[sortidx,:]
+        self._times, self._values, self._offsets = self._flatten_event_data(
+            events, values)
 
         kwargs["fs"] = fs
         kwargs["series_ids"] = series_ids
 
-        self._data = data  # this is necessary so that
-        # super() can determine self.n_series when initializing.
-
-        # initialize super so that self.fs is set:
+        # initialize super so that self.fs is set (the flat event data
+        # are already in place, so that super() can determine
+        # self.n_series when initializing):
         super().__init__(**kwargs)
 
         # print(self.type_name, kwargs)
 
         # if only empty data were received AND no support, attach an
         # empty support:
-        if np.sum([st.size for st in data]) == 0 and support is None:
+        if self._times.size == 0 and support is None:
             logging.warning("no events; cannot automatically determine support")
             support = type(self._abscissa.support)(empty=True)
 
@@ -747,13 +1158,7 @@ class ValueEventArray(BaseValueEventArray):
             # array's support:
             # print('restricting, here')
             self.support = support
-
-        # TODO: if sorted, we may as well use the fast restrict here as well?
-        data = self._restrict_to_interval_array_fast(
-            intervalarray=self.support,
-            data=data)
-
-        self._data = data
+        # (setting the support has restricted the events to it)
         return
 
     @keyword_equivalence(this_or_that={'n_intervals':'n_epochs'})
@@ -800,7 +1205,8 @@ class ValueEventArray(BaseValueEventArray):
             raise StopIteration
 
         self._index += 1
-        return self.loc[index]
+        # same as self.loc[index], without first cloning all of the series
+        return self._intervalslicer(index)
 
     def _intervalslicer(self, idx):
         """Helper function to restrict object to EpochArray."""
@@ -817,49 +1223,42 @@ class ValueEventArray(BaseValueEventArray):
             if support.isempty:
                 return type(self)(empty=True)
 
-            logging.disable(logging.CRITICAL)
             data = self._restrict_to_interval_array_fast(
                 intervalarray=support,
-                data=self.data,
-                copyover=True
+                data=(self._times, self._values, self._offsets),
+                quiet=True
                 )
             eventarray = self._copy_without_data()
-            eventarray._data = data
+            eventarray._times, eventarray._values, eventarray._offsets = data
             eventarray._abscissa.support = support
             eventarray.__renew__()
-            logging.disable(0)
             return eventarray
         elif isinstance(idx, int):
-            eventarray = self._copy_without_data()
+            # an out-of-range idx already raises IndexError here, so only an
+            # empty support is left to skip the restriction for
             support = self._abscissa.support[idx]
-            eventarray._abscissa.support = support
-            if (idx >= self._abscissa.support.n_intervals) or idx < (-self._abscissa.support.n_intervals):
-                eventarray.__renew__()
-                return eventarray
-            else:
+            eventarray = self._copy_without_data()
+            if not support.isempty:
                 data = self._restrict_to_interval_array_fast(
                         intervalarray=support,
-                        data=self.data,
-                        copyover=True
+                        data=(self._times, self._values, self._offsets)
                         )
-                eventarray._data = data
-                eventarray._abscissa.support = support
-                eventarray.__renew__()
-                return eventarray
+                eventarray._times, eventarray._values, eventarray._offsets = data
+            eventarray._abscissa.support = support
+            eventarray.__renew__()
+            return eventarray
         else:  # most likely slice indexing
             try:
-                logging.disable(logging.CRITICAL)
                 support = self._abscissa.support[idx]
                 data = self._restrict_to_interval_array_fast(
                     intervalarray=support,
-                    data=self.data,
-                    copyover=True
+                    data=(self._times, self._values, self._offsets),
+                    quiet=True
                     )
                 eventarray = self._copy_without_data()
-                eventarray._data = data
+                eventarray._times, eventarray._values, eventarray._offsets = data
                 eventarray._abscissa.support = support
                 eventarray.__renew__()
-                logging.disable(0)
                 return eventarray
             except Exception:
                 raise TypeError(
@@ -884,19 +1283,15 @@ class ValueEventArray(BaseValueEventArray):
 
     @property
     def events(self):
-        events = []
-        for series in self.data:
-            events.append(series[:,0].squeeze())
-
-        return np.asarray(events)
+        # per-series views into the flat event times
+        events = np.split(self._times, self._offsets[1:-1])
+        return _as_series_array([series.squeeze() for series in events])
 
     @property
     def values(self):
-        values = []
-        for series in self.data:
-            values.append(series[:,1:].squeeze())
-
-        return np.asarray(values)
+        # per-series views into the flat event values
+        values = np.split(self._values, self._offsets[1:-1])
+        return _as_series_array([series.squeeze() for series in values])
 
     def flatten(self, *, series_id=None):
         """Collapse events across series.
@@ -915,73 +1310,17 @@ class ValueEventArray(BaseValueEventArray):
 
         flattened = self._copy_without_data()
 
-        flattened._series_ids = [series_id]
-
-        raise NotImplementedError
-        alldatas = self.data[0]
-        for series in range(1,self.n_series):
-            alldatas = utils.linear_merge(alldatas, self.data[series])
-
-        flattened._data = np.array(list(alldatas), ndmin=2)
+        # a single stable sort of the flat event data merges all series
+        order = np.argsort(self._times, kind='stable')
+        flattened._times = self._times[order]
+        flattened._values = self._values[order]
+        flattened._offsets = np.array([0, order.size], dtype=np.int64)
+        flattened.series_ids = [series_id]
         flattened.__renew__()
         return flattened
 
-    @staticmethod
-    def _restrict_to_interval_array_fast(intervalarray, data, copyover=True):
-        """Return data restricted to an IntervalArray.
-
-        This function assumes sorted event datas, so that binary search can
-        be used to quickly identify slices that should be kept in the
-        restriction. It does not check every event data.
-
-        Parameters
-        ----------
-        intervalarray : IntervalArray or EpochArray
-        data : list or array-like, each element of size (n_events, n_values).
-        """
-        # print('_restrict base')
-        if intervalarray.isempty:
-            n_series = len(data)
-            data = np.zeros((n_series,0))
-            return data
-
-        singleseries = len(data)==1  # bool
-
-        # TODO: is this copy even necessary?
-        if copyover:
-            data = copy.copy(data)
-
-        # NOTE: this used to assume multiple series for the enumeration to work
-        for series, evt_data in enumerate(data):
-            indices = []
-            for epdata in intervalarray.data:
-                t_start = epdata[0]
-                t_stop = epdata[1]
-                frm, to = np.searchsorted(evt_data[:,0], (t_start, t_stop))
-                indices.append((frm, to))
-            indices = np.array(indices, ndmin=2)
-            if np.diff(indices).sum() < len(evt_data):
-                logging.info('ignoring events outside of eventarray support')
-            if singleseries:
-                data_list = []
-                for start, stop in indices:
-                    data_list.extend(evt_data[start:stop])
-                data = np.array([data_list])
-            else:
-                # here we have to do some annoying conversion between
-                # arrays and lists to fully support jagged array
-                # mutation
-                data_list = []
-                for start, stop in indices:
-                    data_list.extend(evt_data[start:stop])
-                data_ = data.tolist()
-                data_[series] = np.array(data_list)
-                data = utils.ragged_array(data_)
-        return data
-
     def __repr__(self):
         address_str = " at " + str(hex(id(self)))
-        logging.disable(logging.CRITICAL)
         if self.isempty:
             return "<empty " + self.type_name + address_str + ">"
         if self._abscissa.support.n_intervals > 1:
@@ -993,7 +1332,6 @@ class ValueEventArray(BaseValueEventArray):
         else:
             fsstr = ""
         numstr = " %s %s" % (self.n_series, self._series_label)
-        logging.disable(0)
         return "<%s%s:%s%s>%s" % (self.type_name, address_str, numstr, epstr, fsstr)
 
     def bin(self, *, ds=None, method='sum'):
@@ -1009,26 +1347,26 @@ class ValueEventArray(BaseValueEventArray):
         """(np.array) The number of events in each series."""
         if self.isempty:
             return 0
-        return np.array([len(series) for series in self.data])
+        return np.diff(self._offsets)
 
     @property
     def n_values(self):
         """(int) The number of values associated with each event series."""
         if self.isempty:
             return 0
-        n_values = []
-        for series in self.data:
-            n_values.append(series.squeeze().shape[1] - 1)
-        return n_values
+        # every series has the same number of value columns
+        return self._values.shape[1]
 
     @property
     def issorted(self):
         """(bool) Sorted EventArray."""
         if self.isempty:
             return True
-        return np.array(
-            [utils.is_sorted(eventarray[:,0]) for eventarray in self.data]
-            ).all()
+        # steps across series boundaries don't count
+        decreasing = np.diff(self._times) < 0
+        boundaries = self._offsets[1:-1] - 1
+        decreasing[boundaries[(boundaries >= 0) & (boundaries < decreasing.size)]] = False
+        return not decreasing.any()
 
     def _reorder_series_by_idx(self, neworder, inplace=False):
         """Reorder series according to a specified order.
@@ -1045,14 +1383,13 @@ class ValueEventArray(BaseValueEventArray):
         else:
             out = self.copy()
 
-        oldorder = list(range(len(neworder)))
-        for oi, ni in enumerate(neworder):
-            frm = oldorder.index(ni)
-            to = oi
-            utils.swap_rows(out._data, frm, to)
-            out._series_ids[frm], out._series_ids[to] = out._series_ids[to], out._series_ids[frm]
-            # TODO: re-build series tags (tag system not yet implemented)
-            oldorder[frm], oldorder[to] = oldorder[to], oldorder[frm]
+        neworder = np.asarray(neworder, dtype=np.intp).ravel()
+        if not np.array_equal(np.sort(neworder), np.arange(out.n_series)):
+            raise ValueError("neworder must be a permutation of range(n_series)")
+        # a single gather of the flat event data, instead of pairwise swaps
+        out._take_series(neworder)
+        # TODO: re-build series tags (tag system not yet implemented)
+        out.series_ids = [out._series_ids[ii] for ii in neworder]
         out.__renew__()
 
         return out
@@ -1072,19 +1409,9 @@ class ValueEventArray(BaseValueEventArray):
         else:
             out = self.copy()
 
-        neworder = [self.series_ids.index(x) for x in neworder]
-
-        oldorder = list(range(len(neworder)))
-        for oi, ni in enumerate(neworder):
-            frm = oldorder.index(ni)
-            to = oi
-            utils.swap_rows(out._data, frm, to)
-            out._series_ids[frm], out._series_ids[to] = out._series_ids[to], out._series_ids[frm]
-            # TODO: re-build series tags (tag system not yet implemented)
-            oldorder[frm], oldorder[to] = oldorder[to], oldorder[frm]
+        neworder = [self._series_id_index[x] for x in neworder]
 
-        out.__renew__()
-        return out
+        return out._reorder_series_by_idx(neworder, inplace=True)
 
     def make_stateful(self):
         raise NotImplementedError
@@ -1190,6 +1517,10 @@ class StatefulValueEventArray(BaseValueEventArray):
                                         series_label='tetrodes',
                                         **kwargs
                                         )
+
+    As for ValueEventArray, the first construction in a fresh installation
+    compiles (and caches on disk) the numba kernels used for restriction
+    and pseudo-event merging, which takes a few seconds.
     """
 
     # specify class-specific aliases:
@@ -1217,6 +1548,8 @@ class StatefulValueEventArray(BaseValueEventArray):
         'spikes': 'events'
         }
 
+    __attributes__ = ["_times", "_values", "_offsets"]
+    __attributes__.extend(BaseValueEventArray.__attributes__)
     def __init__(self, events=None, values=None, *, fs=None, support=None,
                  series_ids=None, empty=False, **kwargs):
         # add class-specific aliases to existing aliases:
@@ -1234,10 +1567,12 @@ class StatefulValueEventArray(BaseValueEventArray):
         # print('non-stateful preprocessing')
         self._val_init(events=events, values=values,fs=fs, support=support,
                  series_ids=series_ids, empty=empty, **kwargs)
+        if empty:
+            return
 
         # print('making stateful')
-        data = self._make_stateful(data=self.data)
-        self._data = data
+        self._times, self._values, self._offsets = self._make_stateful(
+            data=(self._times, self._values, self._offsets))
 
     def _val_init(self, events=None, values=None, *, fs=None, support=None,
                  series_ids=None, empty=False, **kwargs):
@@ -1253,11 +1588,15 @@ class StatefulValueEventArray(BaseValueEventArray):
         values =  kwargs.pop('values', None)
         #############################################
 
+        if not empty and events is not None and values is None:
+            raise ValueError('values are required for every event; use an '
+                             'EventArray for events without values')
+
         # if an empty object is requested, return it:
         if empty:
             super().__init__(empty=True)
             for attr in self.__attributes__:
-                exec("self." + attr + " = None")
+                setattr(self, attr, None)
             self._abscissa.support = type(self._abscissa.support)(empty=True)
             return
 
@@ -1266,112 +1605,23 @@ class StatefulValueEventArray(BaseValueEventArray):
             fs = 30000
             logging.info("No sampling rate was specified! Assuming default of {} Hz.".format(fs))
 
-        def is_singletons(data):
-            """Returns True if data is a list of singletons (more than one)."""
-            data = np.array(data)
-            try:
-                if data.shape[-1] < 2 and np.max(data.shape) > 1:
-                    return True
-                if max(np.array(data).shape[:-1]) > 1 and data.shape[-1] == 1:
-                    return True
-            except (IndexError, TypeError, ValueError):
-                return False
-            return False
-
-        def is_single_series(data):
-            """Returns True if data represents event datas from a single series.
-
-            Examples
-            ========
-            [1, 2, 3]           : True
-            [[1, 2, 3]]         : True
-            [[1, 2, 3], []]     : False
-            [[], [], []]        : False
-            [[[[1, 2, 3]]]]     : True
-            [[[[[1],[2],[3]]]]] : False
-            """
-            try:
-                if isinstance(data[0][0], list) or isinstance(data[0][0], np.ndarray):
-                    logging.info("event datas input has too many layers!")
-                    try:
-                        if max(np.array(data).shape[:-1]) > 1:
-            #                 singletons = True
-                            return False
-                    except ValueError:
-                        return False
-                    data = np.squeeze(data)
-            except (IndexError, TypeError):
-                pass
-            try:
-                if isinstance(data[1], list) or isinstance(data[1], np.ndarray):
-                    return False
-            except (IndexError, TypeError):
-                pass
-            return True
-
-        def standardize_to_2d(data):
-            if is_single_series(data):
-                return np.array(np.squeeze(data), ndmin=2)
-            if is_singletons(data):
-                data = np.squeeze(data)
-                n = np.max(data.shape)
-                if len(data.shape) == 1:
-                    m = 1
-                else:
-                    m = np.min(data.shape)
-                data = np.reshape(data, (n,m))
-            else:
-                data = np.squeeze(data)
-                if data.dtype == np.dtype('O'):
-                    jagged = True
-                else:
-                    jagged = False
-                if jagged:  # jagged array
-                    # standardize input so that a list of lists is converted
-                    # to an array of arrays:
-                    data = utils.ragged_array(
-                        [np.array(st, ndmin=1, copy=False) for st in data])
-                else:
-                    data = np.array(data, ndmin=2)
-            return data
-
-        def standardize_values_to_2d(data):
-            data = standardize_to_2d(data)
-            for ii, series in enumerate(data):
-                if len(series.shape) == 2:
-                    pass
-                else:
-                    for xx in series:
-                        if len(np.atleast_1d(xx)) > 1:
-                            raise ValueError('each series must have a fixed number of values; mismatch in series {}'.format(ii))
-            return data
-
-        events = standardize_to_2d(events)
-        values = standardize_values_to_2d(values)
-
-        data = []
-        for a, v in zip(events, values):
-            data.append(np.vstack((a, v.T)).T)
-        data = np.array(data)
+        events = _standardize_to_2d(events)
+        values = _standardize_values_to_2d(values)
 
-        #sort event series, but only if necessary:
-        for ii, train in enumerate(events):
-            if not utils.is_sorted(train):
-                sortidx = np.argsort(train)
-                data[ii] = (data[ii])[sortidx,:]
+        self._times, self._values, self._offsets = self._flatten_event_data(
+            events, values)
 
         kwargs["fs"] = fs
         kwargs["series_ids"] = series_ids
 
-        self._data = data  # this is necessary so that
-        # super() can determine self.n_series when initializing.
-
-        # initialize super so that self.fs is set:
+        # initialize super so that self.fs is set (the flat event data
+        # are already in place, so that super() can determine
+        # self.n_series when initializing):
         super().__init__(**kwargs)
 
         # if only empty data were received AND no support, attach an
         # empty support:
-        if np.sum([st.size for st in data]) == 0 and support is None:
+        if self._times.size == 0 and support is None:
             logging.warning("no events; cannot automatically determine support")
             support = type(self._abscissa.support)(empty=True)
 
@@ -1383,19 +1633,12 @@ class StatefulValueEventArray(BaseValueEventArray):
             # array's support:
             self._abscissa.support = support
 
-        # TODO: if sorted, we may as well use the fast restrict here as well?
-        data = self._restrict_to_interval_array_fast(
-            intervalarray=self.support,
-            data=data)
-
-        self._data = data
+        self._times, self._values, self._offsets = \
+            self._restrict_to_interval_array_fast(
+                intervalarray=self.support,
+                data=(self._times, self._values, self._offsets))
         return
 
-    @property
-    def data(self):
-        """Event datas in seconds."""
-        return self._data
-
     @keyword_equivalence(this_or_that={'n_intervals':'n_epochs'})
     def partition(self, ds=None, n_intervals=None):
         """Returns a BaseEventArray whose support has been partitioned.
@@ -1440,7 +1683,8 @@ class StatefulValueEventArray(BaseValueEventArray):
             raise StopIteration
 
         self._index += 1
-        return self.loc[index]
+        # same as self.loc[index], without first cloning all of the series
+        return self._intervalslicer(index)
 
     def __getitem__(self, idx):
         """EventArray index access.
@@ -1467,10 +1711,10 @@ class StatefulValueEventArray(BaseValueEventArray):
         else:
             raise TypeError('support must be of type {}'.format(str(type(self._abscissa.support))))
         # restrict data to new support
-        self._data = self._restrict_to_interval_array_value_fast(
+        self._times, self._values, self._offsets = \
+            self._restrict_to_interval_array_value_fast(
                 intervalarray=self._abscissa.support,
-                data=self.data,
-                copyover=True
+                data=(self._times, self._values, self._offsets)
                 )
 
     @property
@@ -1489,10 +1733,10 @@ class StatefulValueEventArray(BaseValueEventArray):
         else:
             raise TypeError('support must be of type {}'.format(str(type(self._abscissa.support))))
         # restrict data to new support
-        self._data = self._restrict_to_interval_array_value_fast(
+        self._times, self._values, self._offsets = \
+            self._restrict_to_interval_array_value_fast(
                 intervalarray=self._abscissa.support,
-                data=self.data,
-                copyover=True
+                data=(self._times, self._values, self._offsets)
                 )
 
     def _intervalslicer(self, idx):
@@ -1510,247 +1754,103 @@ class StatefulValueEventArray(BaseValueEventArray):
             if support.isempty:
                 return type(self)(empty=True)
 
-            logging.disable(logging.CRITICAL)
             data = self._restrict_to_interval_array_value_fast(
                 intervalarray=support,
-                data=self.data,
-                copyover=True
+                data=(self._times, self._values, self._offsets),
+                quiet=True
                 )
             eventarray = self._copy_without_data()
-            eventarray._data = data
+            eventarray._times, eventarray._values, eventarray._offsets = data
             eventarray._abscissa.support = support
             eventarray.__renew__()
-            logging.disable(0)
             return eventarray
         elif isinstance(idx, int):
-            eventarray = self._copy_without_data()
+            # an out-of-range idx already raises IndexError here, so only an
+            # empty support is left to skip the restriction for
             support = self._abscissa.support[idx]
-            eventarray._abscissa.support = support
-            if (idx >= self._abscissa.support.n_intervals) or idx < (-self._abscissa.support.n_intervals):
-                eventarray.__renew__()
-                return eventarray
-            else:
+            eventarray = self._copy_without_data()
+            if not support.isempty:
                 data = self._restrict_to_interval_array_value_fast(
                         intervalarray=support,
-                        data=self.data,
-                        copyover=True
+                        data=(self._times, self._values, self._offsets)
                         )
-                eventarray._data = data
-                eventarray._abscissa.support = support
-                eventarray.__renew__()
-                return eventarray
+                eventarray._times, eventarray._values, eventarray._offsets = data
+            eventarray._abscissa.support = support
+            eventarray.__renew__()
+            return eventarray
         else:  # most likely slice indexing
             try:
-                logging.disable(logging.CRITICAL)
                 support = self._abscissa.support[idx]
                 data = self._restrict_to_interval_array_value_fast(
                     intervalarray=support,
-                    data=self.data,
-                    copyover=True
+                    data=(self._times, self._values, self._offsets),
+                    quiet=True
                     )
                 eventarray = self._copy_without_data()
-                eventarray._data = data
+                eventarray._times, eventarray._values, eventarray._offsets = data
                 eventarray._abscissa.support = support
                 eventarray.__renew__()
-                logging.disable(0)
                 return eventarray
             except Exception:
                 raise TypeError(
                     'unsupported subsctipting type {}'.format(type(idx)))
 
-    @staticmethod
-    def _restrict_to_interval_array_fast(intervalarray, data, copyover=True):
-        """Return data restricted to an IntervalArray.
+    def _restrict_to_interval_array_value_fast(self, intervalarray, data, quiet=False):
+        """Return stateful data restricted to an IntervalArray.
 
         This function assumes sorted event datas, so that binary search can
         be used to quickly identify slices that should be kept in the
-        restriction. It does not check every event data.
+        restriction. It does not check every event data. Pseudo events are
+        added at the boundaries of every interval, unless an event already
+        exists there.
 
         Parameters
         ----------
         intervalarray : IntervalArray or EpochArray
-        data : list or array-like, each element of size (n_events, n_values).
-        """
-        if intervalarray.isempty:
-            n_series = len(data)
-            data = np.zeros((n_series,0))
-            return data
-
-        singleseries = len(data)==1  # bool
-
-        # TODO: is this copy even necessary?
-        if copyover:
-            data = copy.copy(data)
-
-        # NOTE: this used to assume multiple series for the enumeration to work
-        for series, evt_data in enumerate(data):
-            indices = []
-            for epdata in intervalarray.data:
-                t_start = epdata[0]
-                t_stop = epdata[1]
-                frm, to = np.searchsorted(evt_data[:,0], (t_start, t_stop))
-                indices.append((frm, to))
-            indices = np.array(indices, ndmin=2)
-            if np.diff(indices).sum() < len(evt_data):
-                logging.info('ignoring events outside of eventarray support')
-            if singleseries:
-                data_list = []
-                for start, stop in indices:
-                    data_list.extend(evt_data[start:stop])
-                data = np.array([data_list])
-            else:
-                # here we have to do some annoying conversion between
-                # arrays and lists to fully support jagged array
-                # mutation
-                data_list = []
-                for start, stop in indices:
-                    data_list.extend(evt_data[start:stop])
-                data_ = data.tolist()
-                data_[series] = np.array(data_list)
-                data = utils.ragged_array(data_)
-        return data
-
-    def _restrict_to_interval_array_value_fast(self, intervalarray, data, copyover=True):
-        """Return data restricted to an IntervalArray.
-
-        This function assumes sorted event datas, so that binary search can
-        be used to quickly identify slices that should be kept in the
-        restriction. It does not check every event data.
+        data : tuple (times, values, offsets) of flat event data, where the
+            first column of values holds the event kinds.
+        quiet : bool, optional
+            If True, do not log that events outside of the intervals were
+            ignored (see _restrict_to_interval_array_fast).
 
-        Parameters
-        ----------
-        intervalarray : IntervalArray or EpochArray
-        data : list or array-like, each element of size (n_events, n_values).
+        Returns
+        -------
+        data : tuple (times, values, offsets) of restricted flat event data.
         """
-        if intervalarray.isempty:
-            n_series = len(data)
-            data = np.zeros((n_series,0))
+        times, values, offsets = data
+        if offsets is None:
             return data
+        if intervalarray.isempty:
+            return (np.zeros(0), np.zeros((0, values.shape[1]), dtype=values.dtype),
+                    np.zeros_like(offsets))
 
         # plan of action
         # create pseudo events supporting each interval
         # then restrict existing data (pseudo and real events)
         # then merge in all pseudo events that don't exist yet
-        starts = intervalarray.starts
-        stops = intervalarray.stops
-
-        kinds = []
-        events = []
-        states = []
-
-        for series in data:
-            tvect = series[:,0].astype(float)
-            statevals = series[:,2:]
-
-            kind = []
-            state = []
-
-            for start in starts:
-                idx = np.max((np.searchsorted(tvect, start, side='right')-1,0))
-                kind.append(0)
-                state.append(statevals[[idx]])
-
-            for stop in stops:
-                idx = np.max((np.searchsorted(tvect, stop, side='right')-1,0))
-                kind.append(2)
-                state.append(statevals[[idx]])
-
-            states.append(np.array(state).squeeze()) ## squeeze???
-            events.append(np.hstack((starts, stops)))
-            kinds.append(np.array(kind))
-
-        pseudodata = []
-        for e, k, s in zip(events, kinds, states):
-            pseudodata.append(np.vstack((e, k, s.T)).T)
-
-        pseudodata = utils.ragged_array(pseudodata)
-
-        singleseries = len(data)==1  # bool
-
-        # TODO: is this copy even necessary?
-        if copyover:
-            data = copy.copy(data)
-
-        # NOTE: this used to assume multiple series for the enumeration to work
-        for series, evt_data in enumerate(data):
-            indices = []
-            for epdata in intervalarray.data:
-                t_start = epdata[0]
-                t_stop = epdata[1]
-                frm, to = np.searchsorted(evt_data[:,0], (t_start, t_stop))
-                indices.append((frm, to))
-            indices = np.array(indices, ndmin=2)
-            if np.diff(indices).sum() < len(evt_data):
-                logging.info('ignoring events outside of eventarray support')
-            if singleseries:
-                data_list = []
-                for start, stop in indices:
-                    data_list.extend(evt_data[start:stop])
-                data = np.array([data_list])
-            else:
-                # here we have to do some annoying conversion between
-                # arrays and lists to fully support jagged array
-                # mutation
-                data_list = []
-                for start, stop in indices:
-                    data_list.extend(evt_data[start:stop])
-                data_ = data.tolist()
-                data_[series] = np.array(data_list)
-                data = utils.ragged_array(data_)
-
-        # now add in all pseudo events that don't already exist in data
-
-        kinds = []
-        events = []
-        states = []
-
-        for pseries, series in zip(pseudodata, data):
-            ptvect = pseries[:,0].astype(float)
-            pkind = pseries[:,1].astype(int)
-            pstatevals = pseries[:,2:]
-
-            try:
-                tvect = series[:,0].astype(float)
-                kind = series[:,1]
-                statevals = series[:,2:]
-            except IndexError:
-                tvect = np.zeros((0))
-                kind = np.zeros((0))
-                statevals = np.zeros((0,))
-
-            for tt, kk, psv in zip(ptvect, pkind, pstatevals):
-                # print(tt, kk, psv)
-                idx = np.searchsorted(tvect, tt, side='right')
-                idx2 = np.max((idx-1,0))
-                try:
-                    if tt == tvect[idx2]:
-                        pass
-                        # print('pseudo event {} not necessary...'.format(tt))
-                    else:
-                        # print('pseudo event {} necessary...'.format(tt))
-                        kind = np.insert(kind, idx, kk)
-                        tvect = np.insert(tvect, idx, tt)
-                        statevals = np.insert(statevals, idx, psv, axis=0)
-                except IndexError:
-                    kind = np.insert(kind, idx, kk)
-                    tvect = np.insert(tvect, idx, tt)
-                    statevals = np.insert(statevals, idx, psv, axis=0)
-
-            states.append(np.array(statevals).squeeze())
-            events.append(tvect)
-            kinds.append(kind)
-
-        # print(states)
-        # print(tvect)
-        # print(kinds)
-
-        data = []
-        for e, k, s in zip(events, kinds, states):
-            data.append(np.vstack((e, k, s.T)).T)
-
-        data = utils.ragged_array(data)
-
-        return data
+        starts = np.ascontiguousarray(intervalarray.starts, dtype=np.float64)
+        stops = np.ascontiguousarray(intervalarray.stops, dtype=np.float64)
+
+        # pseudo events at every interval start (kind 0) and stop (kind 2),
+        # each carrying the state of the last event at or before it (or of
+        # the first event, if there is none)
+        ptvect = np.hstack((starts, stops))
+        pkind = np.hstack((np.zeros(starts.size), 2*np.ones(stops.size)))
+        pstates = _pseudo_event_states(
+            times, np.ascontiguousarray(values[:,1:]), offsets, ptvect)
+
+        times, values, offsets = self._restrict_to_interval_array_fast(
+            intervalarray=intervalarray,
+            data=data,
+            quiet=quiet)
+
+        # now add in all pseudo events that don't already exist in data,
+        # i.e., those with no event yet (real, or an earlier pseudo event)
+        # at the same time
+        return _merge_flat_pseudo_events(
+            times, np.ascontiguousarray(values[:,0]),
+            np.ascontiguousarray(values[:,1:]), offsets,
+            ptvect, pkind, pstates)
 
     def bin(self, *, ds=None):
         """Return a BinnedValueEventArray."""
@@ -1759,12 +1859,14 @@ class StatefulValueEventArray(BaseValueEventArray):
 
     def __call__(self, *args):
         """StatefulValueEventArray callable method; by default returns state values"""
-        values = []
-        for events, vals in zip(self.state_events, self.state_values):
-            idx = np.searchsorted(events, args, side='right')-1
-            idx[idx<0] = 0
-            values.append(vals[[idx]])
-        values = np.asarray(values)
+        args = np.asarray(args, dtype=np.float64)
+        idx = _last_event_index(self._times, self._offsets, args.ravel())
+        # keep the historical (n_series, 1, *args.shape) shape of the results
+        idx = idx.reshape((self.n_series, 1) + args.shape)
+        # the first column of _values holds the event kinds
+        values = self._values[idx, 1:]
+        if values.shape[-1] == 1:
+            values = values[..., 0]
         return values
 
     def _make_stateful(self, data, intervalarray=None, initial_state=np.nan):
@@ -1776,66 +1878,40 @@ class StatefulValueEventArray(BaseValueEventArray):
 
         needs to change when calling loc, iloc, restrict, getitem, ...
 
+        data is a tuple (times, values, offsets) of flat event data, and
+        the returned flat data have the event kinds in the first column of
+        their values.
+
         TODO: initial_state is not used yet!!!
         """
-        kinds = []
-        events = []
-        states = []
+        times, values, offsets = data
 
         if intervalarray is None:
             intervalarray = self.support
-
-        for series in data:
-            starts = intervalarray.starts
-            stops = intervalarray.stops
-            tvect = series[:,0].astype(float)
-            statevals = series[:,1:]
-            kind = np.ones(tvect.size).astype(int)
-
-            for start in starts:
-                idx = np.searchsorted(tvect, start, side='right')
-                idx2 = np.max((idx-1,0))
-                if start == tvect[idx2]:
-                    continue
-                else:
-                    kind = np.insert(kind, idx, 0)
-                    tvect = np.insert(tvect, idx, start)
-                    statevals = np.insert(statevals, idx, statevals[idx2], axis=0)
-
-            for stop in stops:
-                idx = np.searchsorted(tvect, stop, side='right')
-                idx2 = np.max((idx-1,0))
-                if stop == tvect[idx2]:
-                    continue
-                else:
-                    kind = np.insert(kind, idx, 2)
-                    tvect = np.insert(tvect, idx, stop)
-                    statevals = np.insert(statevals, idx, statevals[idx2], axis=0)
-
-            states.append(statevals)
-            events.append(tvect)
-            kinds.append(kind)
-
-        data = []
-        for e, k, s in zip(events, kinds, states):
-            data.append(np.vstack((e, k, s.T)).T)
-        data = utils.ragged_array(data)
-
-        return data
+        # pseudo events at every interval start (kind 0) and stop (kind 2);
+        # starts come first, so they win over stops at the same time
+        starts = np.ascontiguousarray(intervalarray.starts, dtype=np.float64)
+        stops = np.ascontiguousarray(intervalarray.stops, dtype=np.float64)
+        ptvect = np.hstack((starts, stops))
+        pkind = np.hstack((np.zeros(starts.size), 2*np.ones(stops.size)))
+
+        # each pseudo event carries the state of the last event at or
+        # before it (or of the first event, if there is none)
+        values = np.ascontiguousarray(values, dtype=np.float64)
+        pstates = _pseudo_event_states(times, values, offsets, ptvect)
+        return _merge_flat_pseudo_events(
+            times, np.ones(times.size), values, offsets, ptvect, pkind, pstates)
 
     @property
     def n_values(self):
         """(int) The number of values associated with each event series."""
         if self.isempty:
             return 0
-        n_values = []
-        for series in self.data:
-            n_values.append(series.squeeze().shape[1] - 2)
-        return n_values
+        # every series has the same number of value columns
+        return self._values.shape[1] - 1  # the first column holds the event kinds
 
     def __repr__(self):
         address_str = " at " + str(hex(id(self)))
-        logging.disable(logging.CRITICAL)
         if self.isempty:
             return "<empty " + self.type_name + address_str + ">"
         if self._abscissa.support.n_intervals > 1:
@@ -1847,7 +1923,6 @@ class StatefulValueEventArray(BaseValueEventArray):
         else:
             fsstr = ""
         numstr = " %s %s" % (self.n_series, self._series_label)
-        logging.disable(0)
         return "<%s%s:%s%s>%s" % (self.type_name, address_str, numstr, epstr, fsstr)
 
     @property
@@ -1859,43 +1934,38 @@ class StatefulValueEventArray(BaseValueEventArray):
 
     @property
     def events(self):
-        events = []
-        for series, kinds in zip(self.state_events, self.state_kinds):
-            keep_idx = np.argwhere(kinds==1)
-            events.append(series[keep_idx].squeeze())
-        return np.asarray(events)
+        # only the real events (kind 1), not the interval boundaries
+        keep = np.split(self._values[:,0] == 1, self._offsets[1:-1])
+        events = np.split(self._times, self._offsets[1:-1])
+        return _as_series_array(
+            [series[kk].squeeze() for series, kk in zip(events, keep)])
 
     @property
     def values(self):
-        values = []
-        for series, kinds in zip(self.state_values, self.state_kinds):
-            keep_idx = np.argwhere(kinds==1)
-            values.append(series[keep_idx].squeeze())
-        return np.asarray(values)
+        # only the real events (kind 1), not the interval boundaries
+        keep = np.split(self._values[:,0] == 1, self._offsets[1:-1])
+        values = np.split(self._values[:,1:], self._offsets[1:-1])
+        return _as_series_array(
+            [series[kk].squeeze() for series, kk in zip(values, keep)])
+
+    # The flat _values array holds the event kinds in its first column,
+    # followed by the state values; per-series views are split off of the
+    # flat arrays directly, without building the ragged .data
 
     @property
     def state_events(self):
-        events = []
-        for series in self.data:
-            events.append(series[:,0].squeeze())
-
-        return np.asarray(events)
+        events = np.split(self._times, self._offsets[1:-1])
+        return _as_series_array([series.squeeze() for series in events])
 
     @property
     def state_values(self):
-        values = []
-        for series in self.data:
-            values.append(series[:,2:].squeeze())
-
-        return np.asarray(values)
+        values = np.split(self._values[:,1:], self._offsets[1:-1])
+        return _as_series_array([series.squeeze() for series in values])
 
     @property
     def state_kinds(self):
-        values = []
-        for series in self.data:
-            values.append(series[:,1].squeeze())
-
-        return np.asarray(values)
+        kinds = np.split(self._values[:,0], self._offsets[1:-1])
+        return _as_series_array([series.squeeze() for series in kinds])
 
     def _plot(self, *args, **kwargs):
         if self.n_series > 1:
@@ -1904,22 +1974,29 @@ class StatefulValueEventArray(BaseValueEventArray):
             raise NotImplementedError
 
         import matplotlib.pyplot as plt
-
-        events = self.state_events.squeeze()
-        values = self.state_values.squeeze()
-        kinds = self.state_kinds.squeeze()
-
-        for (a, b), val, (ka, kb) in zip(utils.pairwise(events), values, utils.pairwise(kinds)):
-            if kb == 1:
-                plt.plot([a, b], [val, val], '-', color='b', markerfacecolor='w', lw=1.5, mew=1.5)
-            if ka == 1:
-                plt.plot([a, b], [val, val], '-', color='g', markerfacecolor='w', lw=1.5, mew=1.5)
-            if kb == 1:
-                plt.plot(b, val, 'o', color='k', markerfacecolor='w', lw=1.5, mew=1.5)
-            if ka == 1:
-                plt.plot(a, val, 'o', color='k', markerfacecolor='k', lw=1.5, mew=1.5)
-            if ka == 0 and kb == 2:
-                plt.plot([a, b], [val, val], '-', color='r', markerfacecolor='w', lw=1.5, mew=1.5)
+        from matplotlib.collections import LineCollection
+
+        events = np.atleast_1d(self.state_events.squeeze())
+        values = np.atleast_1d(self.state_values.squeeze())
+        kinds = np.atleast_1d(self.state_kinds.squeeze())
+
+        # consecutive (a, b) event pairs, each held at the value at a
+        a, b = events[:-1], events[1:]
+        ka, kb = kinds[:-1], kinds[1:]
+        val = values[:a.size]
+        segments = np.stack((np.column_stack((a, val)),
+                             np.column_stack((b, val))), axis=1)
+
+        ax = plt.gca()
+        # one collection per segment color instead of one line per segment
+        for mask, color in ((kb == 1, 'b'),
+                            (ka == 1, 'g'),
+                            ((ka == 0) & (kb == 2), 'r')):
+            if np.any(mask):
+                ax.add_collection(LineCollection(segments[mask], colors=color, lw=1.5))
+        ax.autoscale_view()
+        plt.plot(b[kb == 1], val[kb == 1], 'o', color='k', markerfacecolor='w', lw=1.5, mew=1.5)
+        plt.plot(a[ka == 1], val[ka == 1], 'o', color='k', markerfacecolor='k', lw=1.5, mew=1.5)
 
 
 #----------------------------------------------------------------------#
@@ -0,0 +1,241 @@
+import logging
+
+import nelpy as nel
+import numpy as np
+import pytest
+
+class TestValueEventArray:
+
+    def test_flat_storage(self):
+        events = [[3, 1, 2], [4, 5, 6, 7]]
+        values = [[[5, 6], [1, 2], [3, 4]], [[1, 2], [3, 4], [5, 6], [7, 8]]]
+        veva = nel.ValueEventArray(events=events, values=values)
+
+        assert np.all(veva._offsets == [0, 3, 7])
+        assert np.all(veva._times == [1, 2, 3, 4, 5, 6, 7])
+        assert veva._values.shape == (7, 2)
+        assert veva.n_values == 2
+        # values are sorted together with their events
+        assert np.all(veva._values[:3] == [[1, 2], [3, 4], [5, 6]])
+        assert veva.first_event == 1
+        assert veva.last_event == 7
+
+        # the ragged .data view has columns [time, values...]
+        assert np.all(veva.data[0] == [[1, 1, 2], [2, 3, 4], [3, 5, 6]])
+        assert veva.data[1].shape == (4, 3)
+
+    def test_value_dtype(self):
+        veva = nel.ValueEventArray(events=[[1, 2, 3]], values=[[1, 2, 3]])
+        # values keep their integer dtype, also through restriction
+        assert veva._values.dtype == np.int64
+        assert veva[nel.EpochArray([[1.5, 4]])]._values.dtype == np.int64
+        assert veva._times.dtype == np.float64
+
+    def test_invalid_values(self):
+        # one event per series, but two single values
+        with pytest.raises(ValueError):
+            nel.ValueEventArray(events=[[1], [2]], values=[[[1, 2]], [[3, 4]]])
+        # a different number of values per event in each series
+        with pytest.raises(ValueError):
+            nel.ValueEventArray(events=[[1, 2], [3, 4]],
+                                values=[[[1, 2], [3, 4]], [[1, 2, 3], [4, 5, 6]]])
+        with pytest.raises(ValueError, match='values are required'):
+            nel.ValueEventArray(events=[[1, 2, 3]])
+        with pytest.raises(ValueError, match='values are required'):
+            nel.StatefulValueEventArray(events=[[1, 2, 3]])
+
+    def test_series_indexing(self):
+        events = [[1, 2, 3], [4, 5, 6, 7]]
+        values = [[1, 2, 3], [4, 5, 6, 7]]
+        veva = nel.ValueEventArray(events=events, values=values)
+
+        second = veva.iloc[:, 1]
+        assert second.n_series == 1
+        assert np.all(second._offsets == [0, 4])
+        assert np.all(second.data[0][:, 0] == [4, 5, 6, 7])
+
+        swapped = veva.iloc[:, [1, 0]]
+        assert np.all(swapped._times == [4, 5, 6, 7, 1, 2, 3])
+        assert np.all(veva.loc[:, 1].data[0] == veva.data[0])
+
+    def test_copy(self):
+        veva = nel.ValueEventArray(events=[[1, 2], [3]], values=[[1, 2], [3]])
+        copied = veva.copy()
+
+        # Ensure slicers are attached to copied object
+        assert hex(id(copied)) == hex(id(copied.loc.obj))
+        assert hex(id(copied)) == hex(id(copied.iloc.obj))
+
+        assert copied._times is not veva._times
+        assert np.all(copied._times == veva._times)
+        assert np.all(copied._values == veva._values)
+        assert np.all(copied._offsets == veva._offsets)
+
+    def test_data_is_cached_and_read_only(self):
+        veva = nel.ValueEventArray(events=[[1, 2], [3]], values=[[1, 2], [3]])
+        data = veva.data
+        assert veva.data is data
+        # in-place edits would not reach the flat storage, so they fail
+        with pytest.raises(ValueError):
+            data[0][0, 1] = 10
+        with pytest.raises(ValueError):
+            data[1] = np.array([[3, 30]])
+        # and the cached data follow any change of the flat storage
+        veva._values = veva._values * 10
+        assert veva.data is not data
+        assert np.all(veva.data[0] == [[1, 10], [2, 20]])
+
+    def test_slicing_is_quiet(self, caplog):
+        veva = nel.ValueEventArray(events=[[1, 2, 3, 4]], values=[[1, 2, 3, 4]],
+                                   support=nel.EpochArray([[0, 5]]))
+        with caplog.at_level(logging.INFO):
+            sliced = veva[nel.EpochArray([[1.5, 3.5]])]
+            # slicing drops events by design, and says nothing about it,
+            # without touching the logging configuration of anything else
+            assert 'ignoring events' not in caplog.text
+            assert logging.root.manager.disable == logging.NOTSET
+            sliced.support = nel.EpochArray([[2.5, 3.5]])
+            assert 'ignoring events' in caplog.text
+
+    def test_reorder_series(self):
+        events = [[1, 2], [3, 4, 5], [6]]
+        values = [[1, 2], [3, 4, 5], [6]]
+        veva = nel.ValueEventArray(events=events, values=values, series_ids=[4, 5, 6])
+
+        reordered = veva.reorder_series_by_ids([6, 4, 5])
+        assert reordered.series_ids == [6, 4, 5]
+        assert np.all(reordered._times == [6, 1, 2, 3, 4, 5])
+        assert np.all(reordered._offsets == [0, 1, 3, 6])
+        # the original is left untouched
+        assert veva.series_ids == [4, 5, 6]
+        assert np.all(veva._times == [1, 2, 3, 4, 5, 6])
+
+    def test_ragged_events_and_values(self):
+        events = [[1, 2, 3], [4, 5]]
+        values = [[[1, 1], [2, 2], [3, 3]], [[4, 4], [5, 5]]]
+        veva = nel.ValueEventArray(events=events, values=values)
+
+        assert len(veva.events) == 2
+        assert np.all(veva.events[1] == [4, 5])
+        assert veva.values[0].shape == (3, 2)
+        assert np.all(veva.values[1] == [[4, 4], [5, 5]])
+
+    def test_flatten(self):
+        events = [[1, 4, 6], [2, 3, 5]]
+        values = [[10, 40, 60], [20, 30, 50]]
+        veva = nel.ValueEventArray(events=events, values=values)
+
+        flattened = veva.flatten()
+        assert flattened.n_series == 1
+        assert flattened.series_ids == [0]
+        assert np.all(flattened.data[0][:, 0] == [1, 2, 3, 4, 5, 6])
+        assert np.all(flattened.data[0][:, 1] == [10, 20, 30, 40, 50, 60])
+
+    def test_restrict_multiple_intervals(self):
+        events = [[1, 2, 3, 4, 5, 6, 7, 8], [2.5, 4.5], []]
+        values = [[1, 2, 3, 4, 5, 6, 7, 8], [25, 45], []]
+        veva = nel.ValueEventArray(events=events, values=values, fs=1)
+
+        restricted = veva[nel.EpochArray([[0, 2.5], [3, 6]])]
+        assert restricted.n_intervals == 2
+        # several kept spans per series; intervals are half-open [start, stop)
+        assert np.all(restricted._times == [1, 2, 3, 4, 5, 4.5])
+        assert np.all(restricted._values[:, 0] == [1, 2, 3, 4, 5, 45])
+        # the empty series stays (empty) in place
+        assert np.all(restricted._offsets == [0, 5, 6, 6])
+        assert restricted.n_series == 3
+
+    def test_restrict_csr_unsorted_and_overlapping_intervals(self):
+        from nelpy.core._valeventarray import _restrict_csr
+
+        times = np.array([0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 1.5, 5.5], dtype=float)
+        values = times[:, np.newaxis] * 10
+        offsets = np.array([0, 10, 10, 12])
+
+        # a bound that steps backwards restarts the incremental search
+        starts = np.array([5, 1], dtype=float)
+        stops = np.array([7, 3], dtype=float)
+        new_times, new_values, new_offsets = _restrict_csr(
+            times, values, offsets, starts, stops)
+        assert np.all(new_times == [5, 6, 1, 2, 5.5, 1.5])
+        assert np.all(new_values[:, 0] == new_times * 10)
+        assert np.all(new_offsets == [0, 4, 4, 6])
+
+        # overlapping intervals keep their shared events once per interval
+        starts = np.array([1, 2], dtype=float)
+        stops = np.array([4, 5], dtype=float)
+        new_times, _, new_offsets = _restrict_csr(
+            times, values, offsets, starts, stops)
+        assert np.all(new_times == [1, 2, 3, 2, 3, 4, 1.5])
+        assert np.all(new_offsets == [0, 6, 6, 7])
+
+class TestStatefulValueEventArray:
+
+    @staticmethod
+    def make_sveva():
+        events = [[1, 2, 3, 4, 5], [1.5, 3.5]]
+        values = [[1, 2, 3, 4, 5], [6, 7]]
+        support = nel.EpochArray([[0, 2.5], [3, 6]])
+        return nel.StatefulValueEventArray(events=events, values=values, support=support)
+
+    def test_pseudo_events(self):
+        sveva = self.make_sveva()
+        # columns are [time, kind, state]; kind 0 (1, 2) marks interval
+        # starts (events, stops), and pseudo events carry the last state
+        assert np.all(sveva.data[0] == [[0, 0, 1], [1, 1, 1], [2, 1, 2],
+                                        [2.5, 2, 2], [3, 1, 3], [4, 1, 4],
+                                        [5, 1, 5], [6, 2, 5]])
+        # a pseudo event at the time of a real event is dropped
+        assert np.all(sveva.data[1] == [[0, 0, 6], [1.5, 1, 6], [2.5, 2, 6],
+                                        [3, 0, 6], [3.5, 1, 7], [6, 2, 7]])
+        assert np.all(sveva.events[0] == [1, 2, 3, 4, 5])
+        assert np.all(sveva.values[1] == [6, 7])
+
+    def test_restrict(self):
+        sveva = self.make_sveva()
+        restricted = sveva[nel.EpochArray([[1.5, 4]])]
+        assert restricted.n_intervals == 2
+        assert np.all(restricted.data[0] == [[1.5, 0, 1], [2, 1, 2], [2.5, 2, 2],
+                                             [3, 1, 3], [4, 2, 4]])
+        # the real event at 1.5 wins over the new interval start
+        assert np.all(restricted.data[1] == [[1.5, 1, 6], [2.5, 2, 6], [3, 0, 6],
+                                             [3.5, 1, 7], [4, 2, 7]])
+
+    def test_series_without_events(self):
+        sveva = nel.StatefulValueEventArray(events=[[1, 2, 3], []],
+                                            values=[[1, 2, 3], []])
+        # there is no state for the pseudo events of an empty series to carry
+        assert np.all(sveva.data[1][:, 1] == [0, 2])
+        assert np.all(np.isnan(sveva.data[1][:, 2]))
+        assert np.all(sveva.data[0][:3, 2] == [1, 2, 3])
+
+    def test_merge_pseudo_events(self):
+        from nelpy.core._valeventarray import _merge_pseudo_events
+
+        times = np.array([1., 3.])
+        kinds = np.ones(2)
+        states = np.array([[10.], [30.]])
+        # a start (kind 0) and a stop (kind 2) at 2, and a stop at the time
+        # of the real event at 3
+        ptimes = np.array([2., 2., 3.])
+        pkinds = np.array([0., 2., 2.])
+        pstates = np.array([[20.], [21.], [31.]])
+        new_times, new_kinds, new_states = _merge_pseudo_events(
+            times, kinds, states, ptimes, pkinds, pstates)
+        assert np.all(new_times == [1, 2, 3])
+        # the first pseudo event at a time wins, and real events win over
+        # pseudo events
+        assert np.all(new_kinds == [1, 0, 1])
+        assert np.all(new_states[:, 0] == [10, 20, 30])
+
+    def test_call(self):
+        sveva = self.make_sveva()
+        assert np.all(sveva(2.2).ravel() == [2, 6])
+        queries = np.array([0.5, 2.5, 3.7, 5.5])
+        batched = sveva(queries)
+        assert batched.shape == (2, 1, 1, 4)
+        expected = [[1, 2, 3, 5], [6, 6, 7, 7]]
+        assert np.all(batched.reshape(2, 4) == expected)
+        # batched queries agree with one call per query
+        for qq, query in enumerate(queries):
+            assert np.all(sveva(query).ravel() == batched.reshape(2, 4)[:, qq])
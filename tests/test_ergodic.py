@@ -0,0 +1,122 @@
+import numpy as np
+import pytest
+from scipy import sparse
+
+from nelpy.analysis.ergodic import (steady_state, fmpt, var_fmpt,
+                                    ergodic_stats, fmpt_batch, _NUMBA_MAX_K)
+
+# chain sizes on both sides of the jit-compiled small chain kernels
+SIZES = [5, _NUMBA_MAX_K + 36]
+
+def random_chain(k, seed=0):
+    """Dense ergodic (and generally not reversible) transition matrix."""
+    P = np.random.default_rng(seed).random((k, k)) + 0.01
+    return P / P.sum(axis=1, keepdims=True)
+
+def reversible_chain(k, seed=0):
+    """Random walk on a weighted graph, which satisfies detailed balance."""
+    W = np.random.default_rng(seed).random((k, k))
+    W = W + W.T
+    return W / W.sum(axis=1, keepdims=True)
+
+def sparse_chain(k, n_neighbors=3, seed=0):
+    """Ergodic transition matrix with a few transitions per state: a ring
+    with self-transitions, plus n_neighbors random transitions."""
+    rng = np.random.default_rng(seed)
+    P = np.zeros((k, k))
+    for i in range(k):
+        P[i, [i, (i + 1) % k]] = 1.
+        P[i, rng.integers(0, k, n_neighbors)] = rng.random(n_neighbors)
+    return P / P.sum(axis=1, keepdims=True)
+
+def reference_stats(P):
+    """Steady state, first mean passage times and their variances from the
+    Kemeny and Snell formulas, with an explicit inverse of I - P + 1 ss^T."""
+    k = P.shape[0]
+    w, v = np.linalg.eig(P.T)
+    ss = np.real(v[:, np.argmin(np.abs(w - 1))])
+    ss = ss / ss.sum()
+    I = np.identity(k)
+    A = np.ones((k, 1)) @ ss[np.newaxis, :]
+    Z = np.linalg.inv(I - P + A)
+    D = np.diag(1. / ss)
+    Zdg = np.diag(np.diag(Z))
+    E = np.ones((k, k))
+    M = (I - Z + E @ Zdg) @ D
+    ZM = Z @ M
+    V = M @ (2 * Zdg @ D - I) + 2 * (ZM - E @ np.diag(np.diag(ZM))) - M * M
+    return ss, M, V
+
+class TestErgodic:
+
+    @pytest.mark.parametrize('k', SIZES)
+    def test_steady_state(self, k):
+        P = random_chain(k)
+        ss, _, _ = reference_stats(P)
+        assert np.allclose(steady_state(P), ss)
+
+    @pytest.mark.parametrize('k', SIZES)
+    def test_fmpt(self, k):
+        P = random_chain(k)
+        _, M, _ = reference_stats(P)
+        assert np.allclose(fmpt(P), M)
+
+    @pytest.mark.parametrize('k', SIZES)
+    def test_var_fmpt(self, k):
+        P = random_chain(k)
+        _, _, V = reference_stats(P)
+        assert np.allclose(var_fmpt(P), V)
+
+    @pytest.mark.parametrize('k', SIZES)
+    def test_ergodic_stats(self, k):
+        P = random_chain(k)
+        for computed, expected in zip(ergodic_stats(P), reference_stats(P)):
+            assert np.allclose(computed, expected)
+
+    @pytest.mark.parametrize('k', SIZES)
+    def test_reversible(self, k):
+        """The Cholesky path for reversible chains."""
+        P = reversible_chain(k)
+        _, M, V = reference_stats(P)
+        assert np.allclose(fmpt(P, reversible=True), M)
+        assert np.allclose(var_fmpt(P, reversible=True), V)
+
+    @pytest.mark.parametrize('k', SIZES)
+    def test_reversible_rejects_irreversible_chain(self, k):
+        P = random_chain(k)
+        with pytest.raises(ValueError):
+            fmpt(P, reversible=True)
+        with pytest.raises(ValueError):
+            var_fmpt(P, reversible=True)
+
+    @pytest.mark.parametrize('k', SIZES)
+    def test_float32(self, k):
+        P = random_chain(k)
+        _, M, V = reference_stats(P)
+        M32 = fmpt(P, dtype=np.float32)
+        assert M32.dtype == np.float32
+        assert np.allclose(M32, M, rtol=1e-3)
+        assert np.allclose(var_fmpt(P, dtype=np.float32), V, rtol=1e-3)
+
+    def test_sparse_steady_state(self):
+        """scipy.sparse input, and large dense input with few transitions,
+        are solved with a sparse factorization."""
+        P = sparse_chain(300)
+        assert np.count_nonzero(P) <= 0.1 * P.size
+        ss, _, _ = reference_stats(P)
+        assert np.allclose(steady_state(P), ss)
+        assert np.allclose(steady_state(sparse.csr_matrix(P)), ss)
+        assert np.allclose(steady_state(sparse.csr_matrix(P, dtype=np.float32)),
+                           ss, rtol=1e-4)
+
+    @pytest.mark.parametrize('k', SIZES)
+    def test_fmpt_batch(self, k):
+        Ps = np.stack([random_chain(k, seed=seed) for seed in range(3)])
+        M = fmpt_batch(Ps)
+        assert M.shape == (3, k, k)
+        for P, MP in zip(Ps, M):
+            assert np.allclose(MP, reference_stats(P)[1])
+
+    def test_fmpt_batch_rejects_single_matrix(self):
+        with pytest.raises(ValueError):
+            fmpt_batch(random_chain(5))